@@ -1,11 +1,14 @@
 
-from PIL import Image, ImageDraw
 import random
+from tiling import tiled_wallpaper
+import tracing
+from encode import EncodeQueue, save_image
 
 # Define the size of the pixel art and the wallpaper
 pixel_size = 10  # Each pixel in the pattern will be 10x10 pixels
 pattern_size = (10, 10)  # 10x10 pixel pattern
 wallpaper_size = (1080, 1920)  # Typical mobile wallpaper size
+compress_level = 6  # zlib level for the PNGs, 0 (fastest) to 9 (smallest)
 
 # Define a list of colors
 colors = [
@@ -19,32 +22,50 @@ colors = [
     (0, 0, 0)  # Black
 ]
 
-def create_pattern(colors, pattern_size, pixel_size):
-    pattern = Image.new('RGB', (pattern_size[0] * pixel_size, pattern_size[1] * pixel_size), color='white')
-    draw = ImageDraw.Draw(pattern)
-    
-    for y in range(pattern_size[1]):
-        for x in range(pattern_size[0]):
-            color = random.choice(colors)  # Randomly select a color
-            draw.rectangle([x * pixel_size, y * pixel_size, (x + 1) * pixel_size, (y + 1) * pixel_size], fill=color)
-    
-    return pattern
-
-def create_wallpaper(pattern, wallpaper_size):
-    wallpaper = Image.new('RGB', wallpaper_size, color='black')
-    
-    repeat_x = wallpaper_size[0] // pattern.size[0]
-    repeat_y = wallpaper_size[1] // pattern.size[1]
-    
-    for y in range(repeat_y):
-        for x in range(repeat_x):
-            wallpaper.paste(pattern, (x * pattern.size[0], y * pattern.size[1]))
-    
-    return wallpaper
-
-# Create 10 unique wallpapers
-for i in range(10):
-    pattern = create_pattern(colors, pattern_size, pixel_size)
-    wallpaper = create_wallpaper(pattern, wallpaper_size)
-    wallpaper.save(f'pixel_art_wallpaper_{i+1}.png')
-    print(f'Wallpaper {i+1} created.')
+def create_pattern(colors, pattern_size, rng=random):
+    # Randomly select a color index for every cell
+    return [[rng.randrange(len(colors)) for x in range(pattern_size[0])]
+            for y in range(pattern_size[1])]
+
+def create_wallpaper(pattern, colors, pixel_size, wallpaper_size):
+    # Indexed output: the pattern only ever uses the colors above
+    return tiled_wallpaper(pattern, colors, pixel_size, wallpaper_size, mode='P')
+
+def create_tile(pattern):
+    # One period of the tiling, the part of the wallpaper that carries the pattern
+    return create_wallpaper(pattern, colors, pixel_size,
+                            (pattern_size[0] * pixel_size, pattern_size[1] * pixel_size))
+
+def create_tiled_wallpaper(file_path='pixel_art_wallpaper_1.png', encoder=None, rng=random, dedup=None):
+    """Tile one random pattern, drawn from rng, and save it to file_path.
+
+    With a dedup.DedupIndex, a pattern whose tile is a near-duplicate of an
+    indexed one is not tiled, encoded or written, and None is returned.
+    """
+    with tracing.render('10.pattern', size=wallpaper_size):
+        with tracing.stage('pattern'):
+            pattern = create_pattern(colors, pattern_size, rng)
+        if dedup is not None:
+            with tracing.stage('dedup'):
+                if not dedup.admit(create_tile(pattern), file_path):
+                    return None
+        with tracing.stage('tile', wallpaper_size[0] * wallpaper_size[1]):
+            wallpaper = create_wallpaper(pattern, colors, pixel_size, wallpaper_size)
+        save_image(wallpaper, file_path, encoder=encoder, compress_level=compress_level)
+    return file_path
+
+def create_wallpapers(count=10, dedup=None):
+    """Create count unique wallpapers, encoding each while the next is tiled"""
+    paths = []
+    with EncodeQueue() as encoder:
+        for i in range(count):
+            file_path = create_tiled_wallpaper(f'pixel_art_wallpaper_{i+1}.png', encoder, dedup=dedup)
+            if file_path is None:
+                print(f'Wallpaper {i+1} skipped as a near-duplicate.')
+                continue
+            paths.append(file_path)
+            print(f'Wallpaper {i+1} created.')
+    return paths
+
+if __name__ == "__main__":
+    create_wallpapers()
@@ -1,68 +1,110 @@
 
-from PIL import Image, ImageDraw, ImageFilter
+from PIL import Image, ImageDraw
 import math
 import random
-import colorsys
 import os
+import tracing
+from cache import render_key
+from derive import derive_rendered, save_derived
+from hsv import hue_table
+from postfx import Blur, Pipeline, Vignette
+from strips import render_strips, write_png
+from vignette import apply_vignette
 
-# Create output directory
-os.makedirs("wallpapers", exist_ok=True)
+CACHE_MODULES = (__name__, "hsv", "postfx", "vignette", "strips")  # Hashed into cache keys
 
 # Dimensions for 4K vertical mobile wallpaper
 WIDTH, HEIGHT = 2160, 3840
 CENTER = (WIDTH // 2, HEIGHT // 2)
-
-def hsv2rgb(h, s, v):
-    return tuple(round(i * 255) for i in colorsys.hsv_to_rgb(h, s, v))
+POST = Pipeline(Vignette(intensity=0.6), Blur(radius=1))
+BLUR_HALO = POST.halo  # Rows of context post-processing needs at strip edges
 
 def draw_symmetric_shapes(draw, count=72, radius=1400):
     angle_step = 360 / count
+    colors = hue_table(count, 0.8, 1)
     for i in range(count):
         angle = math.radians(i * angle_step)
         x = CENTER[0] + radius * math.cos(angle)
         y = CENTER[1] + radius * math.sin(angle)
-        color = hsv2rgb(i / count, 0.8, 1)
+        color = colors[i]
         draw.ellipse([x - 40, y - 40, x + 40, y + 40], fill=color, outline=None)
 
-def draw_concentric_polygons(draw, levels=20):
+def draw_concentric_polygons(draw, levels=20, rng=random):
+    colors = hue_table(levels, 0.7, 0.9)
     for i in range(1, levels + 1):
-        sides = random.choice([3, 4, 6, 8])
+        sides = rng.choice([3, 4, 6, 8])
         radius = i * 70
-        angle_offset = random.uniform(0, math.pi * 2)
+        angle_offset = rng.uniform(0, math.pi * 2)
         points = []
         for j in range(sides):
             theta = angle_offset + 2 * math.pi * j / sides
             x = CENTER[0] + radius * math.cos(theta)
             y = CENTER[1] + radius * math.sin(theta)
             points.append((x, y))
-        color = hsv2rgb(i / levels, 0.7, 0.9)
+        color = colors[i]
         draw.polygon(points, outline=color, fill=None)
 
-def apply_radial_gradient(img, intensity=0.6):
-    gradient = Image.new("L", (WIDTH, HEIGHT), 0)
-    draw = ImageDraw.Draw(gradient)
-    for i in range(max(WIDTH, HEIGHT)):
-        opacity = int(255 * (1 - intensity * i / max(WIDTH, HEIGHT)))
-        draw.ellipse([
-            CENTER[0] - i, CENTER[1] - i,
-            CENTER[0] + i, CENTER[1] + i
-        ], fill=opacity)
-    black_overlay = Image.new("RGB", (WIDTH, HEIGHT), "black")
-    img.paste(black_overlay, (0, 0), gradient)
+def apply_radial_gradient(img, intensity=0.6, top=0):
+    apply_vignette(img, CENTER, intensity, (WIDTH, HEIGHT), top)
 
-def generate_geometric_wallpaper():
-    base = Image.new("RGB", (WIDTH, HEIGHT), "black")
-    draw = ImageDraw.Draw(base)
+def post_process(img, top=0):
+    """Vignette then soften in one banded pass; img may be a strip starting at row top"""
+    return POST(img, top, (WIDTH, HEIGHT))
 
+def draw_geometric_shapes(draw, rng=random):
     draw_symmetric_shapes(draw)
-    draw_concentric_polygons(draw)
+    draw_concentric_polygons(draw, rng=rng)
+
+def render_geometric_wallpaper(file_path, seed, strip_height=None, profiles=None):
+    with tracing.render("4k.geometric", size=(WIDTH, HEIGHT), seed=seed, strip_height=strip_height):
+        if strip_height:
+            # Every strip replays the same random polygons from a fresh stream
+            strips = render_strips((WIDTH, HEIGHT), lambda draw: draw_geometric_shapes(draw, random.Random(seed)),
+                                   strip_height, halo=BLUR_HALO, post=post_process)
+            write_png(file_path, (WIDTH, HEIGHT), strips)
+            if profiles:
+                with tracing.stage("derive"):
+                    derive_rendered(file_path, profiles)
+        else:
+            base = Image.new("RGB", (WIDTH, HEIGHT), "black")
+            draw = ImageDraw.Draw(base)
+
+            with tracing.stage("draw", WIDTH * HEIGHT):
+                draw_geometric_shapes(draw, random.Random(seed))
+
+            base = post_process(base)
+            # The format follows file_path, so callers naming a .png get a PNG
+            options = {"format": "PNG"} if file_path.lower().endswith(".png") else {"format": "JPEG", "quality": 95}
+            with tracing.stage("save", WIDTH * HEIGHT):
+                base.save(file_path, **options)
+            if profiles:
+                with tracing.stage("derive", WIDTH * HEIGHT):
+                    save_derived(base, file_path, profiles, **options)
+        tracing.output(file_path)
+    return file_path
 
-    apply_radial_gradient(base)
+def generate_geometric_wallpaper(strip_height=None, seed=None, cache=None, profiles=None, file_path=None):
+    """Render the wallpaper for seed (random if None), which also names the file.
 
-    base = base.filter(ImageFilter.GaussianBlur(radius=1))
-    file_path = f"wallpapers/geometric_4k_wallpaper_{random.randint(1000,9999)}.jpg"
-    base.save(file_path, "JPEG", quality=95)
+    The polygons draw from their own random.Random(seed), so the same seed
+    gives the same wallpaper in any process. profiles adds device-sized
+    copies (see derive.DEVICE_PROFILES) beside it.
+    """
+    if seed is None:
+        seed = random.randint(1000, 9999)
+    if file_path is None:
+        os.makedirs("wallpapers", exist_ok=True)
+        file_path = f"wallpapers/geometric_4k_wallpaper_{seed}.{'png' if strip_height else 'jpg'}"
+    fmt = "png" if strip_height or file_path.lower().endswith(".png") else "jpg"
+    if cache is None:
+        render_geometric_wallpaper(file_path, seed, strip_height, profiles)
+    else:
+        key = render_key(CACHE_MODULES, {}, seed, (WIDTH, HEIGHT), fmt)
+        cache.render(key, fmt, lambda path: render_geometric_wallpaper(path, seed, strip_height, profiles),
+                     file_path, profiles=profiles)
     print(f"Wallpaper saved at: {file_path}")
+    return file_path
 
 # Run the generator
-generate_geometric_wallpaper()
+if __name__ == "__main__":
+    generate_geometric_wallpaper()
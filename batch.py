@@ -0,0 +1,65 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import inspect
+import os
+import random
+import time
+import registry
+
+def job_seed(base_seed, index):
+    """Derive a stable seed for the job at index in a batch"""
+    return (base_seed * 1_000_003 + index) % 2**32
+
+def run_job(design, params, seed):
+    """Import design (a registry name or "module:function"), seed it and call it with params.
+
+    As in shards.render_variant, generators taking an rng get
+    random.Random(seed) and generators taking a seed get seed, unless
+    params sets them; the global random module is seeded for the rest.
+    """
+    func, defaults = registry.lookup(design)
+    params = {**defaults, **params}
+    accepted = inspect.signature(func).parameters
+    if "rng" in accepted:
+        params.setdefault("rng", random.Random(seed))
+    elif "seed" in accepted:
+        params.setdefault("seed", seed)
+    random.seed(seed)
+    start = time.perf_counter()
+    result = func(**params)
+    return result, time.perf_counter() - start
+
+def render_batch(jobs, workers=None, base_seed=0):
+    """Render (design, params, seed) jobs across a process pool.
+
+    A seed of None is replaced by job_seed(base_seed, index), so re-running
+    the same batch reproduces the same images. Progress and per-job timing
+    are printed as jobs finish; results are returned in job order.
+    """
+    jobs = [
+        (design, params, job_seed(base_seed, index) if seed is None else seed)
+        for index, (design, params, seed) in enumerate(jobs)
+    ]
+    results = [None] * len(jobs)
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(run_job, *job): index for index, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            design, params, seed = jobs[index]
+            output, seconds = future.result()
+            results[index] = {
+                "design": design,
+                "params": params,
+                "seed": seed,
+                "output": output,
+                "seconds": seconds,
+            }
+            print(f"[{done}/{len(jobs)}] {design} seed={seed} {seconds:.2f}s -> {output}")
+
+    print(f"Rendered {len(jobs)} jobs in {time.perf_counter() - start:.2f}s")
+    return results
+
+if __name__ == "__main__":
+    jobs = [(name, {}, None) for name in registry.names("gg.") + registry.names("wave.")]
+    render_batch(jobs)
@@ -0,0 +1,240 @@
+"""Benchmarks for the drawing and post-processing functions.
+
+Each case runs in a forked child so its peak memory can be measured on its
+own. Results are appended to a JSON-lines history file and compared with
+the median of earlier runs; the exit status is 1 if any case slowed down by
+more than the threshold.
+
+    python bench.py --sizes mobile,4k --filter pix. --threshold 0.25
+"""
+from PIL import Image, ImageDraw
+import argparse
+import contextlib
+import datetime
+import importlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SIZES = {
+    "mobile": (1080, 1920),
+    "4k": (2160, 3840),
+    "8k": (4320, 7680),
+}
+
+PIX_FUNCTIONS = [
+    "draw_pixel_mountains", "draw_space_invaders", "draw_pixel_hearts",
+    "draw_retro_landscape", "draw_digital_rain", "draw_pixel_sunset",
+    "draw_minecraft_blocks", "draw_pixel_city", "draw_pixel_ocean",
+    "draw_abstract_pixels",
+]
+
+def _sized(module_name, size):
+    # Runs in the forked child, so resizing the module does not leak
+    mod = importlib.import_module(module_name)
+    mod.WIDTH, mod.HEIGHT = size
+    if hasattr(mod, "CENTER"):
+        mod.CENTER = (size[0] // 2, size[1] // 2)
+    return mod
+
+def case_radial_gradient(module_name):
+    def setup(size):
+        from vignette import radial_mask
+        mod = _sized(module_name, size)
+        img = Image.new("RGB", size, "white")
+
+        def run():
+            radial_mask.cache_clear()
+            mod.apply_radial_gradient(img)
+        return run
+    return setup
+
+def case_post_process(module_name):
+    def setup(size):
+        mod = _sized(module_name, size)
+        img = Image.new("RGB", size, "white")
+        return lambda: mod.post_process(img)
+    return setup
+
+def case_draw(module_name, func_name, *args, background="black"):
+    def setup(size):
+        mod = _sized(module_name, size)
+        img = Image.new("RGB", size, background)
+        draw = ImageDraw.Draw(img)
+        func = getattr(mod, func_name)
+
+        def run():
+            random.seed(0)
+            func(draw, *args)
+        return run
+    return setup
+
+def case_glow(size):
+    mod = _sized("ge", size)
+    img = Image.new("RGB", size, mod.BACKGROUND)
+    random.seed(0)
+    glows = mod.random_glows()
+    return lambda: mod.add_glow_effects(img, glows)
+
+def case_hex_image(size):
+    mod = _sized("ge", size)
+    return lambda: mod.hex_image(mod.WIDTH, 0, mod.HEIGHT)
+
+def case_wave_frames(size):
+    mod = importlib.import_module("wave")
+
+    def run():
+        for _ in mod.wave_frames(size=size, count=mod.FPS):
+            pass
+    return run
+
+class _StandInInferenceClient:
+    """Local replacement for huggingface_hub.InferenceClient"""
+
+    def text_to_image(self, prompt, width, height, **kwargs):
+        return Image.new("RGB", (width, height), (40, 90, 160))
+
+def case_hug(size):
+    mod = importlib.import_module("hug")
+    client = _StandInInferenceClient()
+    mod.inference_client = lambda model=None: client
+    output_dir = tempfile.mkdtemp(prefix="bench_hug_")
+    return lambda: mod.generate_wallpaper("benchmark", output_dir, *size)
+
+def case_map(size):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    mod = importlib.import_module("map")
+
+    def run():
+        plt.close(mod.create_simple_nigeria_outline())
+    return run
+
+# name -> (setup(size) returning a zero-argument callable, size names or None for all)
+CASES = {
+    "4k.apply_radial_gradient": (case_radial_gradient("4k"), None),
+    "gg.apply_radial_gradient": (case_radial_gradient("gg"), None),
+    "gg.post_process": (case_post_process("gg"), None),
+    "ge.draw_geometric_pattern": (case_draw("ge", "draw_geometric_pattern"), None),
+    "ge.hex_image": (case_hex_image, None),
+    "ge.add_glow_effects": (case_glow, None),
+    "wave.draw_wave_pattern": (case_draw("wave", "draw_wave_pattern", 50, 4, 0.0), None),
+    "wave.wave_frames": (case_wave_frames, ["mobile"]),
+    "hug.generate_wallpaper": (case_hug, ["mobile"]),
+    "map.create_simple_nigeria_outline": (case_map, ["mobile"]),
+}
+CASES.update({f"pix.{name}": (case_draw("pix", name), None) for name in PIX_FUNCTIONS})
+
+def _measure(name, size, repeat, conn):
+    try:
+        run = CASES[name][0](size)
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        timings = []
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        conn.send({"seconds": min(timings), "peak_mb": (peak - baseline) / 1024})
+    except ImportError as e:
+        conn.send({"skipped": str(e)})
+    except Exception as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+def measure(name, size, repeat=3):
+    """Run one case in a forked child and return its timing and peak memory"""
+    ctx = multiprocessing.get_context("fork")
+    parent, child = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_measure, args=(name, size, repeat, child))
+    process.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = {"error": f"worker exited with code {process.exitcode}"}
+    process.join()
+    return result
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def find_regressions(results, history, threshold, window=5):
+    """Compare against the median of the last window recorded runs per case"""
+    regressions = []
+    for key, result in results.items():
+        previous = [run["results"][key]["seconds"] for run in history
+                    if "seconds" in run["results"].get(key, {})][-window:]
+        if "seconds" not in result or not previous:
+            continue
+        baseline = statistics.median(previous)
+        if result["seconds"] > baseline * (1 + threshold):
+            regressions.append((key, baseline, result["seconds"]))
+    return regressions
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="mobile,4k,8k", help="comma-separated: " + ",".join(SIZES))
+    parser.add_argument("--filter", default="", help="only run cases containing this text")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown over the recorded median (0.25 = 25%%)")
+    parser.add_argument("--history", default="bench_history.jsonl")
+    parser.add_argument("--no-record", action="store_true", help="do not append this run to the history")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes.split(",")
+    results = {}
+    for name, (_, case_sizes) in CASES.items():
+        if args.filter not in name:
+            continue
+        for size_name in sizes:
+            if case_sizes is not None and size_name not in case_sizes:
+                continue
+            key = f"{name}@{size_name}"
+            result = measure(name, SIZES[size_name], args.repeat)
+            results[key] = result
+            if "seconds" in result:
+                print(f"{key:48} {result['seconds'] * 1000:10.1f} ms {result['peak_mb']:9.1f} MB")
+            elif "skipped" in result:
+                print(f"{key:48} skipped: {result['skipped']}")
+            else:
+                print(f"{key:48} error: {result['error']}")
+
+    history = load_history(args.history)
+    regressions = find_regressions(results, history, args.threshold)
+    if not args.no_record:
+        with open(args.history, "a") as f:
+            f.write(json.dumps({
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "results": results,
+            }) + "\n")
+
+    for key, baseline, seconds in regressions:
+        print(f"REGRESSION {key}: {baseline * 1000:.1f} ms -> {seconds * 1000:.1f} ms")
+    errors = [key for key, result in results.items() if "error" in result]
+    return 1 if regressions or errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
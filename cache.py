@@ -0,0 +1,151 @@
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+from derive import derived_path, resolve_profiles
+
+def _source(module):
+    try:
+        return inspect.getsource(importlib.import_module(module))
+    except (OSError, TypeError):
+        return None
+
+def render_key(modules, params, seed, size, fmt):
+    """Hash everything that determines a render's output.
+
+    modules names the generator's module and every helper module it draws
+    with. Their whole source is part of the key, so editing any function or
+    module-level setting in them invalidates the entries. params must tell
+    apart the designs of one module.
+    """
+    payload = json.dumps({
+        # The source, not the module name, which is "__main__" when run as a script
+        "source": [_source(module) for module in modules],
+        "params": params,
+        "seed": seed,
+        "size": list(size),
+        "format": fmt,
+    }, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def derived_key(key, name, size):
+    """The key of one device-sized copy of the render cached under key"""
+    return hashlib.sha256(f"{key}:{name}:{size[0]}x{size[1]}".encode()).hexdigest()
+
+def _named(path, name):
+    # The main file for name None, otherwise the copy derive.save_derived puts beside it
+    return path if name is None else derived_path(path, name)
+
+def _publish(src, dst):
+    # A copy, not a hard link: generators save over their output path in
+    # place, which would rewrite a linked cache entry under its old key
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        _remove(tmp)
+        raise
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+class RenderCache:
+    """Content-addressed store of rendered wallpapers, bounded in size.
+
+    Entries are files named <key>.<fmt> in directory. Hits refresh the
+    file's modification time and the least recently used entries are
+    removed once the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory="wallpapers/cache", max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key, fmt):
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def get(self, key, fmt):
+        path = self.path(key, fmt)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def render(self, key, fmt, render, file_path=None, encoder=None, profiles=None):
+        """Return the cached file for key, calling render(path) only on a miss.
+
+        If file_path is given the cached file is also published there and
+        file_path is returned. profiles are the device sizes render saves
+        beside path with derive.save_derived; each is cached under its own
+        derived_key and published beside file_path, so hits neither resize
+        nor re-encode. A hit needs every one of them; otherwise render runs
+        again. If render queued its saves on encoder, each entry is stored
+        once its save completes and the returned path appears then. A render
+        or save that fails leaves no partial file.
+        """
+        keys = {None: key}
+        for name, size in resolve_profiles(profiles or {}).items():
+            keys[name] = derived_key(key, name, size)
+        if all([self.get(entry_key, fmt) for entry_key in keys.values()]):
+            if file_path is None:
+                return self.path(key, fmt)
+            for name, entry_key in keys.items():
+                _publish(self.path(entry_key, fmt), _named(file_path, name))
+            return file_path
+
+        os.makedirs(self.directory, exist_ok=True)
+        partial = os.path.join(self.directory, f"{key}.{os.getpid()}.partial.{fmt}")
+        try:
+            render(partial)
+        except BaseException:
+            for name in keys:
+                _remove(_named(partial, name))
+            raise
+        for name, entry_key in keys.items():
+            source = _named(partial, name)
+            target = None if file_path is None else _named(file_path, name)
+            future = encoder.pending(source) if encoder is not None else None
+            if future is not None:
+                future.add_done_callback(
+                    lambda f, entry_key=entry_key, source=source, target=target:
+                        self._saved(f, entry_key, fmt, source, target))
+            else:
+                self._store(entry_key, fmt, source, target)
+        return file_path or self.path(key, fmt)
+
+    def _saved(self, future, key, fmt, partial, file_path):
+        # The save error itself is raised by the encoder's close()
+        if future.exception() is not None:
+            _remove(partial)
+        else:
+            self._store(key, fmt, partial, file_path)
+
+    def _store(self, key, fmt, partial, file_path):
+        path = self.path(key, fmt)
+        os.replace(partial, path)
+        self.evict()
+        if file_path is not None:
+            _publish(path, file_path)
+        return path
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            # Device-sized partial files are named <key>.<pid>.partial_<profile>.<fmt>
+            if entry.is_file() and ".partial" not in entry.name:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
@@ -0,0 +1,55 @@
+"""List and run registered designs.
+
+    python cli.py list [prefix]
+    python cli.py run gg.flower_pattern strip_height=512 --seed 7
+
+Parameters are name=value pairs; values are Python literals, or strings
+if they do not parse. Only the registry is imported at startup.
+"""
+import argparse
+import ast
+import random
+import registry
+
+def parse_value(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+def parse_params(pairs):
+    params = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"Expected name=value, got {pair!r}")
+        params[key] = parse_value(value)
+    return params
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Wallpaper generators")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="list designs")
+    list_parser.add_argument("prefix", nargs="?", default="")
+    run_parser = commands.add_parser("run", help="run designs")
+    run_parser.add_argument("designs", nargs="+", help="design names, then name=value params")
+    run_parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name in registry.names(args.prefix):
+            print(f"{name:24} {registry.GENERATORS[name]['about']}")
+        return
+
+    designs = [arg for arg in args.designs if "=" not in arg]
+    params = parse_params(arg for arg in args.designs if "=" in arg)
+    unknown = [design for design in designs if design not in registry.GENERATORS and ":" not in design]
+    if unknown:
+        parser.error(f"unknown designs: {', '.join(unknown)}")
+    for design in designs:
+        if args.seed is not None:
+            random.seed(args.seed)
+        print(f"{design}: {registry.run(design, **params)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Skip near-duplicate wallpapers before they are encoded.
+
+Each image is reduced to a 64-bit difference hash (dHash) from a 9x8
+thumbnail, then checked against a persistent SQLite index of earlier
+hashes. The hash is stored split into four 16-bit bands, each indexed:
+two hashes within Hamming distance 3 must agree exactly on at least one
+band, so a lookup reads only the rows sharing a band instead of scanning
+the table, and stays fast with millions of entries.
+
+Hash the image that carries the design. For tiled wallpapers that is one
+tile period: a thumbnail of the whole frame averages several tiles per
+cell, so its bits follow the tiling phase rather than the pattern and
+distinct patterns collide.
+
+    with DedupIndex() as dedup:
+        if dedup.admit(img, file_path):
+            save_image(img, file_path)
+"""
+from PIL import Image
+import numpy as np
+import os
+import sqlite3
+
+DEDUP_PATH = "wallpapers/dedup.sqlite"
+BANDS = 4
+BAND_BITS = 64 // BANDS
+MAX_DISTANCE = BANDS - 1  # The largest distance the band lookup cannot miss
+
+def dhash(img):
+    """64-bit difference hash: whether each pixel of a 9x8 grayscale thumbnail is brighter than its left neighbour"""
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    # Shrinking first keeps the grayscale conversion down to 72 pixels
+    thumb = np.asarray(img.resize((9, 8), Image.BOX, reducing_gap=3.0).convert("L"), dtype=np.int16)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def _bands(value):
+    return [(value >> (BAND_BITS * i)) & ((1 << BAND_BITS) - 1) for i in range(BANDS)]
+
+def _signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+class DedupIndex:
+    """Persistent index of wallpaper hashes with Hamming-distance lookup.
+
+    Images within max_distance bits of an indexed hash count as
+    duplicates. Inserts are committed on close, or every commit_every
+    inserts so a long batch does not hold one huge transaction.
+    """
+
+    def __init__(self, path=DEDUP_PATH, max_distance=MAX_DISTANCE, commit_every=1000):
+        if max_distance > MAX_DISTANCE:
+            raise ValueError(f"max_distance above {MAX_DISTANCE} can miss matches with {BANDS} bands")
+        self.max_distance = max_distance
+        self.commit_every = commit_every
+        self._pending = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f"band{i} INTEGER" for i in range(BANDS))
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS hashes (hash INTEGER, {columns}, key TEXT)")
+        for i in range(BANDS):
+            self.db.execute(f"CREATE INDEX IF NOT EXISTS hashes_band{i} ON hashes (band{i})")
+        self._query = "SELECT hash, key FROM hashes WHERE " + " OR ".join(f"band{i} = ?" for i in range(BANDS))
+        self._insert = f"INSERT INTO hashes VALUES (?, {', '.join('?' * BANDS)}, ?)"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+
+    def match(self, value):
+        """The (hash, key) of an indexed hash within max_distance of value, or None"""
+        for other, key in self.db.execute(self._query, _bands(value)):
+            other &= (1 << 64) - 1
+            if bin(other ^ value).count("1") <= self.max_distance:
+                return other, key
+        return None
+
+    def add(self, value, key=None):
+        self.db.execute(self._insert, [_signed(value), *_bands(value), key])
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.commit()
+
+    def admit(self, img, key=None):
+        """Index img and return True, or return False if it is a near-duplicate of an indexed image"""
+        value = dhash(img)
+        if self.match(value) is not None:
+            return False
+        self.add(value, key)
+        return True
+
+    def commit(self):
+        self.db.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
@@ -0,0 +1,83 @@
+from concurrent.futures import Future
+import contextvars
+import queue
+import threading
+import tracing
+
+class EncodeQueue:
+    """Save finished frames on worker threads while the caller renders the next.
+
+    submit() blocks once maxsize frames are waiting to be encoded, which
+    keeps at most maxsize + workers frames in memory. Submitted images must
+    not be modified afterwards. Failed saves are kept until close() raises
+    them, so callers may drop the futures.
+    """
+
+    def __init__(self, workers=2, maxsize=4):
+        self._queue = queue.Queue(maxsize)
+        self._pending = {}
+        self._errors = []
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, image, file_path, *args, **kwargs):
+        """Queue image.save(file_path, *args, **kwargs); returns a Future for the path"""
+        future = Future()
+        with self._lock:
+            self._pending[file_path] = future
+        # Run the save in the caller's context so tracing attributes it to the right render
+        self._queue.put((contextvars.copy_context(), future, image, file_path, args, kwargs))
+        return future
+
+    def pending(self, file_path):
+        """The Future for a queued save of file_path, or None if there is none"""
+        with self._lock:
+            return self._pending.get(file_path)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            context, future, image, file_path, args, kwargs = item
+            try:
+                context.run(_save, image, file_path, *args, **kwargs)
+            except Exception as e:
+                with self._lock:
+                    self._errors.append(e)
+                future.set_exception(e)
+            else:
+                future.set_result(file_path)
+            finally:
+                with self._lock:
+                    if self._pending.get(file_path) is future:
+                        del self._pending[file_path]
+
+    def close(self):
+        """Wait for queued frames; raises the first save error, if any"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _save(image, file_path, *args, **kwargs):
+    with tracing.stage("save", image.width * image.height):
+        image.save(file_path, *args, **kwargs)
+    tracing.output(file_path)
+
+def save_image(image, file_path, *args, encoder=None, **kwargs):
+    """Save now, or hand the frame to encoder and return its Future"""
+    if encoder is None:
+        _save(image, file_path, *args, **kwargs)
+        return None
+    return encoder.submit(image, file_path, *args, **kwargs)
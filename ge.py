@@ -2,38 +2,138 @@
 from PIL import Image, ImageDraw
 import math
 import random
-import colorsys
+import numpy as np
+from hsv import hsv2rgb, hsv2rgb_array
+from cache import render_key
+from derive import derive_rendered, save_derived
+from glow import draw_glow
+from strips import render_strips, write_png
+import tracing
 
 # Wallpaper dimensions
 WIDTH, HEIGHT = 3840, 2160  # 4K resolution
 BACKGROUND = (15, 15, 25)    # Dark blue-black
+HEX_OUTLINE = (30, 30, 40)
+HEX_CHUNK_ROWS = 128  # Rows per pass of hex_field, bounds its temporary arrays
+HEX_IMAGE_MAX_CELL = 50  # Below this cell size hex_image beats the per-cell Pillow loop
+CACHE_MODULES = (__name__, "hsv", "glow", "strips")  # Hashed into cache keys
 
-# Create new image
-img = Image.new('RGB', (WIDTH, HEIGHT), BACKGROUND)
-draw = ImageDraw.Draw(img)
+def hex_centers(cell_size):
+    """Centers of the hexagon grid as (rows, cols) arrays, even rows offset"""
+    rows = HEIGHT // cell_size + 2
+    cols = WIDTH // cell_size + 2
+    row = np.arange(rows)[:, None]
+    col = np.arange(cols)[None, :]
+    x = col * cell_size + np.where(row % 2 == 0, cell_size / 2, 0)
+    y = np.broadcast_to(row * cell_size * 0.866, x.shape)  # Hexagonal spacing
+    return x, y
+
+def hex_colors(x, y):
+    """Fill color and inner ring colors (outermost first) for cells at x, y"""
+    hue = (x / WIDTH + y / HEIGHT * 0.5) % 1.0
+    saturation = 0.7 + 0.3 * np.sin(x * 0.01)
+    value = 0.8 + 0.2 * np.cos(y * 0.005)
+    fill = hsv2rgb_array(hue, saturation, value)
+    rings = [
+        hsv2rgb_array(
+            (hue + 0.1 * i) % 1.0,
+            np.maximum(0.3, saturation - 0.1 * i),
+            np.minimum(1.0, value + 0.1 * i)
+        )
+        for i in range(3, 0, -1)
+    ]
+    return fill, rings
+
+def hex_layers(cell_size):
+    """Per-cell colors as a (rows, cols, 5, 3) array: outline, fill, then rings from the outside in"""
+    xs, ys = hex_centers(cell_size)
+    fill, rings = hex_colors(xs, ys)
+    outline = np.broadcast_to(np.array(HEX_OUTLINE, dtype=np.uint8), fill.shape)
+    return np.stack([outline, fill] + rings, axis=2)
+
+def hex_image(width, top, bottom, cell_size=120, supersample=1, background=BACKGROUND):
+    """Rows top to bottom of the hex pattern as an RGB image.
+
+    Vectorized equivalent of draw_geometric_pattern. Each sample tests the
+    four cells that can cover it against the hexagon's distance field and
+    keeps the last one in drawing order, then picks outline, fill or ring
+    by its distance to that cell's center. Along a row that choice repeats
+    every cell_size pixels, one column further on, so only the first period
+    is evaluated and the rest is a table lookup; the cost does not grow as
+    cell_size shrinks. supersample=n antialiases the hexagon,
+    outline and ring edges by averaging n x n samples per pixel.
+    """
+    layers = hex_layers(cell_size)
+    rows, cols = layers.shape[:2]
+    radius = cell_size * 0.8 * 0.9
+    apothem = radius * math.sqrt(3) / 2
+    # Squared ring radii, innermost first, for counting the rings a sample is inside
+    ring_limits = np.array([(radius * i * 0.25) ** 2 for i in range(1, 4)], dtype=np.float32)
+    spacing = cell_size * 0.866
+
+    period = cell_size * supersample
+    samples = width * supersample
+    first = min(period, samples)
+    tiles = max(1, -(-(samples - first) // period))
+    steps = np.arange(1, tiles + 1, dtype=np.int32)[:, None] * 5
+    x = (np.arange(period, dtype=np.float32) + 0.5) / supersample - 0.5
 
-def hsv_to_rgb(h, s, v):
-    return tuple(round(i * 255) for i in colorsys.hsv_to_rgb(h, s, v))
+    # Cell colors as packed RGBX words, then enough background entries that
+    # the uncovered index plus any column step still lands on background
+    uncovered = rows * cols * 5
+    table = np.zeros((uncovered + 5 * tiles + 1, 4), dtype=np.uint8)
+    table[:uncovered, :3] = layers.reshape(-1, 3)
+    table[uncovered:, :3] = background
+    table = table.view(np.uint32).ravel()
 
-def draw_geometric_pattern():
+    packed = np.empty(((bottom - top) * supersample, samples), dtype=np.uint32)
+    for start in range(top, bottom, HEX_CHUNK_ROWS):
+        stop = min(start + HEX_CHUNK_ROWS, bottom)
+        y = np.arange(start * supersample, stop * supersample, dtype=np.float32)[:, None]
+        y = (y + 0.5) / supersample - 0.5
+        first_row = np.floor(y / spacing).astype(np.int32)
+        index = np.full((len(y), len(x)), uncovered, dtype=np.int32)
+        # The same period without the left edge, where column -1 does not exist
+        repeat = index.copy()
+
+        # Candidates in drawing order: later rows, then later columns, paint over earlier ones
+        for row in (first_row, first_row + 1):
+            offset = np.where(row % 2 == 0, cell_size / 2, 0).astype(np.float32)
+            dy = np.abs(y - row * np.float32(spacing))
+            first_col = np.floor((x - offset) / cell_size).astype(np.int32)
+            for col in (first_col, first_col + 1):
+                dx = np.abs(x - (col * cell_size + offset))
+                edge = np.maximum(dx - apothem, 0.5 * dx + 0.866 * dy - apothem)
+                layer = 4 - np.searchsorted(ring_limits, dx * dx + dy * dy).astype(np.int32)
+                layer[edge > -1] = 0
+                covered = (row >= 0) & (row < rows) & (edge <= 0)
+                cell = (row * cols + col) * 5 + layer
+                repeat = np.where(covered, cell, repeat)
+                index = np.where(covered & (col >= 0), cell, index)
+
+        # Later periods repeat this one, a column (5 table entries) further per period
+        chunk = packed[(start - top) * supersample:(stop - top) * supersample]
+        chunk[:, :first] = table[index[:, :first]]
+        repeated = (repeat[:, None, :] + steps).reshape(len(y), -1)
+        chunk[:, first:] = table[repeated[:, :samples - first]]
+
+    image = Image.frombuffer('RGBX', (samples, len(packed)), packed, 'raw', 'RGBX', 0, 1).convert('RGB')
+    return image.reduce(supersample) if supersample > 1 else image
+
+def draw_geometric_pattern(draw, cell_size=120):
     # Parameters
-    cell_size = 120
-    rows = HEIGHT // cell_size + 2
-    cols = WIDTH // cell_size + 2
     max_radius = cell_size * 0.8
     
-    for row in range(rows):
-        for col in range(cols):
-            # Calculate center position with offset for even rows
-            offset = cell_size / 2 if row % 2 == 0 else 0
-            x = col * cell_size + offset
-            y = row * cell_size * 0.866  # Hexagonal spacing
-            
-            # Generate color based on position
-            hue = (x / WIDTH + y / HEIGHT * 0.5) % 1.0
-            saturation = 0.7 + 0.3 * math.sin(x * 0.01)
-            value = 0.8 + 0.2 * math.cos(y * 0.005)
-            color = hsv_to_rgb(hue, saturation, value)
+    xs, ys = hex_centers(cell_size)
+    fill, rings = hex_colors(xs, ys)
+    fill = fill.tolist()
+    rings = [ring.tolist() for ring in rings]
+    
+    for row in range(xs.shape[0]):
+        for col in range(xs.shape[1]):
+            x = float(xs[row, col])
+            y = float(ys[row, col])
+            color = tuple(fill[row][col])
             
             # Draw hexagon
             sides = 6
@@ -45,50 +145,99 @@ def draw_geometric_pattern():
                 py = y + radius * math.sin(angle)
                 points.append((px, py))
             
-            draw.polygon(points, fill=color, outline=(30, 30, 40))
+            draw.polygon(points, fill=color, outline=HEX_OUTLINE)
             
             # Draw inner circles
-            for i in range(3, 0, -1):
+            for i, ring in zip(range(3, 0, -1), rings):
                 inner_radius = radius * i * 0.25
-                inner_color = hsv_to_rgb(
-                    (hue + 0.1 * i) % 1.0,
-                    max(0.3, saturation - 0.1 * i),
-                    min(1.0, value + 0.1 * i)
-                )
                 draw.ellipse(
                     (x - inner_radius, y - inner_radius, 
                      x + inner_radius, y + inner_radius),
-                    fill=inner_color
+                    fill=tuple(ring[row][col])
                 )
 
-def add_glow_effects():
+def random_glows(count=50, rng=random):
+    glows = []
+    for _ in range(count):
+        x = rng.randint(0, WIDTH)
+        y = rng.randint(0, HEIGHT)
+        radius = rng.randint(100, 500)
+        hue = rng.random()
+        color = hsv2rgb(hue, 0.5, 0.9)
+        glows.append((x, y, radius, color))
+    return glows
+
+def add_glow_effects(img, glows, top=0):
     # Create a glow effect by drawing semi-transparent circles
-    for _ in range(50):
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT)
-        radius = random.randint(100, 500)
-        hue = random.random()
-        color = hsv_to_rgb(hue, 0.5, 0.9)
-        
-        # Create a temporary image for the glow
-        glow = Image.new('RGBA', (WIDTH, HEIGHT), (0, 0, 0, 0))
-        glow_draw = ImageDraw.Draw(glow)
-        
-        for i in range(10, 0, -1):
-            alpha = 5 * i
-            r = radius * i / 10
-            glow_draw.ellipse(
-                (x - r, y - r, x + r, y + r),
-                fill=(color[0], color[1], color[2], alpha)
-            )
-        
-        # Composite the glow onto the main image
-        img.paste(Image.alpha_composite(img.convert('RGBA'), glow), (0, 0))
+    for x, y, radius, color in glows:
+        draw_glow(img, x, y, radius, color, offset=top)
 
-# Generate the wallpaper
-draw_geometric_pattern()
-add_glow_effects()
+def use_hex_image(cell_size, supersample):
+    # Pillow draws large cells faster and cannot antialias
+    return cell_size < HEX_IMAGE_MAX_CELL or supersample > 1
+
+def render_hex_wallpaper(file_path, strip_height=None, cell_size=120, supersample=1, profiles=None, rng=random):
+    glows = random_glows(rng=rng)
+    vectorized = use_hex_image(cell_size, supersample)
+    with tracing.render("ge.hex", size=(WIDTH, HEIGHT), strip_height=strip_height,
+                        cell_size=cell_size, supersample=supersample):
+        if strip_height:
+            def draw_strip(draw):
+                top = draw.top
+                if vectorized:
+                    draw.image.paste(hex_image(WIDTH, top, top + draw.image.height, cell_size, supersample))
+                else:
+                    draw_geometric_pattern(draw, cell_size)
+                with tracing.stage("composite", draw.image.width * draw.image.height):
+                    add_glow_effects(draw.image, glows, draw.top)
 
-# Save the image
-img.save('geometric_wallpaper.png')
-print("Wallpaper generated successfully!")
+            strips = render_strips((WIDTH, HEIGHT), draw_strip, strip_height, BACKGROUND)
+            write_png(file_path, (WIDTH, HEIGHT), strips)
+            if profiles:
+                with tracing.stage("derive"):
+                    derive_rendered(file_path, profiles)
+        else:
+            with tracing.stage("draw", WIDTH * HEIGHT):
+                if vectorized:
+                    img = hex_image(WIDTH, 0, HEIGHT, cell_size, supersample)
+                else:
+                    img = Image.new('RGB', (WIDTH, HEIGHT), BACKGROUND)
+                    draw_geometric_pattern(ImageDraw.Draw(img), cell_size)
+            with tracing.stage("composite", WIDTH * HEIGHT):
+                add_glow_effects(img, glows)
+            with tracing.stage("save", WIDTH * HEIGHT):
+                img.save(file_path)
+            if profiles:
+                with tracing.stage("derive", WIDTH * HEIGHT):
+                    save_derived(img, file_path, profiles)
+        tracing.output(file_path)
+    return file_path
+
+def generate_hex_wallpaper(file_path='geometric_wallpaper.png', strip_height=None, seed=None, cache=None,
+                           cell_size=120, supersample=1, profiles=None):
+    """Render the hex pattern with glows; stream it in strips if strip_height is set.
+
+    cell_size sets the hexagon spacing and supersample > 1 antialiases the
+    edges; both of those, or cells under HEX_IMAGE_MAX_CELL, use the
+    vectorized hex_image, otherwise Pillow draws each cell. profiles also saves device-sized copies (see
+    derive.DEVICE_PROFILES) beside file_path. With a seed the glows come
+    from their own random.Random(seed); caching needs one, since the glows
+    are random.
+    """
+    if cache is None:
+        rng = random if seed is None else random.Random(seed)
+        return render_hex_wallpaper(file_path, strip_height, cell_size, supersample, profiles, rng)
+    if seed is None:
+        raise ValueError("A seed is required to cache hex wallpapers")
+
+    def render(path):
+        return render_hex_wallpaper(path, strip_height, cell_size, supersample, profiles, random.Random(seed))
+
+    params = {"cell_size": cell_size, "supersample": supersample}
+    key = render_key(CACHE_MODULES, params, seed, (WIDTH, HEIGHT), "png")
+    return cache.render(key, "png", render, file_path, profiles=profiles)
+
+# Generate the wallpaper
+if __name__ == "__main__":
+    generate_hex_wallpaper()
+    print("Wallpaper generated successfully!")
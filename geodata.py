@@ -0,0 +1,278 @@
+"""Local cache of map geometry with a name and bounding box index.
+
+The first load converts a source dataset (anything geopandas reads, or
+GeoJSON without it) into a cache directory:
+
+    coords.npy   every vertex, as one float64 (n, 2) array
+    index.json   per feature: name, properties, bounding box, and the
+                 [start, stop) vertex range of each ring, grouped by polygon
+
+Later loads parse only index.json and memory-map coords.npy, so a
+country's outline is a slice of the mapped file: there is no shapefile
+parse and only that country's pages are read. The cache is rebuilt when
+the source file's size or modification time changes.
+
+Simplified outlines are cached beside it, under lod/<level>/, one file
+per feature and level of detail. Level n allows an error of 2 ** n map
+units; lod_level picks the coarsest level that stays under LOD_PIXELS
+at a given output density.
+
+    store = open_store()
+    polygons = store.shape("Nigeria")
+    polygons = store.shape("Nigeria", lod_level(degrees_per_pixel))
+"""
+from functools import lru_cache
+import json
+import math
+import os
+import shutil
+import numpy as np
+
+GEODATA_DIR = "wallpapers/geodata"
+NATURAL_EARTH = "naturalearth_lowres"
+INDEX_VERSION = 1
+LOD_PIXELS = 0.5  # Simplification error allowed, in output pixels
+
+def natural_earth_path():
+    """The Natural Earth countries dataset that ships with geopandas"""
+    import geopandas as gpd
+    return gpd.datasets.get_path(NATURAL_EARTH)
+
+def _geojson_polygons(geometry):
+    """Polygons of a GeoJSON geometry, each a list of rings of (x, y) pairs"""
+    if geometry is None:
+        return []
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    return []
+
+def read_features(source, name_column="name"):
+    """Yield (name, properties, polygons) for each feature of source"""
+    if source.endswith((".geojson", ".json")):
+        with open(source) as f:
+            for feature in json.load(f)["features"]:
+                properties = feature.get("properties") or {}
+                yield properties.get(name_column), properties, _geojson_polygons(feature.get("geometry"))
+        return
+
+    import geopandas as gpd
+    from shapely.geometry import mapping
+    frame = gpd.read_file(source)
+    records = frame.drop(columns=frame.geometry.name).to_dict("records")
+    for properties, geometry in zip(records, frame.geometry):
+        polygons = _geojson_polygons(mapping(geometry)) if geometry is not None else []
+        yield properties.get(name_column), properties, polygons
+
+def _json_value(value):
+    # NumPy scalars from geopandas columns
+    return value.item() if hasattr(value, "item") else str(value)
+
+def _stamp(source, name_column):
+    stat = os.stat(source)
+    return {"version": INDEX_VERSION, "source": os.path.abspath(source), "size": stat.st_size,
+            "mtime": stat.st_mtime, "name_column": name_column}
+
+def lod_level(units_per_pixel, pixels=LOD_PIXELS):
+    """The coarsest level of detail whose error stays under pixels at this density"""
+    return math.floor(math.log2(units_per_pixel * pixels))
+
+def simplify_ring(ring, tolerance):
+    """Douglas-Peucker simplification of a closed ring, or None if it collapses"""
+    keep = np.zeros(len(ring), dtype=bool)
+    keep[0] = keep[-1] = True
+    spans = [(0, len(ring) - 1)]
+    while spans:
+        start, stop = spans.pop()
+        if stop - start < 2:
+            continue
+        a, b = ring[start], ring[stop]
+        offsets = ring[start + 1:stop] - a
+        direction = b - a
+        length = math.hypot(*direction)
+        if length == 0:
+            # The closing span of a ring starts and ends on the same point
+            distance = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distance = np.abs(direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0]) / length
+        farthest = int(np.argmax(distance))
+        if distance[farthest] > tolerance:
+            middle = start + 1 + farthest
+            keep[middle] = True
+            spans += [(start, middle), (middle, stop)]
+    # A closed ring needs three corners plus the closing point
+    return ring[keep] if keep.sum() >= 4 else None
+
+def simplify_polygons(polygons, tolerance):
+    """Simplify every ring, dropping collapsed holes and polygons whose exterior collapses.
+
+    If every polygon collapses, the one with the most vertices is kept at
+    full detail so the feature never disappears.
+    """
+    simplified = []
+    for rings in polygons:
+        exterior = simplify_ring(np.asarray(rings[0]), tolerance)
+        if exterior is None:
+            continue
+        holes = (simplify_ring(np.asarray(ring), tolerance) for ring in rings[1:])
+        simplified.append([exterior] + [hole for hole in holes if hole is not None])
+    if not simplified and polygons:
+        simplified = [[np.asarray(ring) for ring in max(polygons, key=lambda rings: len(rings[0]))]]
+    return simplified
+
+def build_cache(source, directory, name_column="name"):
+    """Convert source into directory; index.json is written last, so a partial build is never used"""
+    os.makedirs(directory, exist_ok=True)
+    # Simplified outlines of the previous source
+    shutil.rmtree(os.path.join(directory, "lod"), ignore_errors=True)
+    features, chunks, count = [], [], 0
+    for name, properties, polygons in read_features(source, name_column):
+        first, parts = len(chunks), []
+        for polygon in polygons:
+            rings = []
+            for ring in polygon:
+                ring = np.asarray(ring, dtype=np.float64)[:, :2]
+                chunks.append(ring)
+                rings.append([count, count + len(ring)])
+                count += len(ring)
+            parts.append(rings)
+        bbox = None
+        if len(chunks) > first:
+            points = np.concatenate(chunks[first:])
+            bbox = [*points.min(axis=0).tolist(), *points.max(axis=0).tolist()]
+        features.append({"name": name, "properties": properties, "bbox": bbox, "parts": parts})
+
+    coords = np.concatenate(chunks) if chunks else np.empty((0, 2))
+    tmp = os.path.join(directory, f"coords.{os.getpid()}.tmp.npy")
+    np.save(tmp, coords)
+    os.replace(tmp, os.path.join(directory, "coords.npy"))
+    tmp = os.path.join(directory, f"index.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"stamp": _stamp(source, name_column), "features": features}, f, default=_json_value)
+    os.replace(tmp, os.path.join(directory, "index.json"))
+
+def _read_index(directory):
+    try:
+        with open(os.path.join(directory, "index.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+class GeoStore:
+    """Features of one cached dataset, looked up by name or bounding box.
+
+    Vertices stay in the memory-mapped coords.npy; shape() returns views
+    into it, so only the pages of the features actually drawn are read.
+    Simplified shapes are kept in memory and on disk by (feature, level).
+    """
+
+    def __init__(self, directory, index=None):
+        self.directory = directory
+        index = index or _read_index(directory)
+        self.features = index["features"]
+        self.names = {}
+        for i, feature in enumerate(self.features):
+            self.names.setdefault(feature["name"], i)
+        self.bounds = np.array([feature["bbox"] or [math.nan] * 4 for feature in self.features],
+                               dtype=np.float64).reshape(-1, 4)
+        self._coords = None
+        self._lod = {}
+
+    @property
+    def coords(self):
+        if self._coords is None:
+            self._coords = np.load(os.path.join(self.directory, "coords.npy"), mmap_mode="r")
+        return self._coords
+
+    def feature(self, name):
+        try:
+            return self.features[self.names[name]]
+        except KeyError:
+            raise KeyError(f"No feature named {name!r} in {self.directory}") from None
+
+    def bbox(self, name):
+        """(minx, miny, maxx, maxy) of the named feature"""
+        return tuple(self.feature(name)["bbox"])
+
+    def query(self, bbox):
+        """Names of the features whose bounding boxes intersect bbox"""
+        minx, miny, maxx, maxy = bbox
+        hits = ((self.bounds[:, 0] <= maxx) & (self.bounds[:, 2] >= minx)
+                & (self.bounds[:, 1] <= maxy) & (self.bounds[:, 3] >= miny))
+        return [self.features[i]["name"] for i in np.flatnonzero(hits)]
+
+    def shape(self, name, level=None):
+        """Polygons of the named feature, each a list of (n, 2) ring arrays, exterior first.
+
+        With a level, the outline simplified to within 2 ** level map units.
+        """
+        feature = self.feature(name)
+        if level is not None:
+            return self._simplified(self.names[name], name, level)
+        coords = self.coords
+        return [[coords[start:stop] for start, stop in rings] for rings in feature["parts"]]
+
+    def _simplified(self, index, name, level):
+        key = (index, level)
+        if key in self._lod:
+            return self._lod[key]
+        path = os.path.join(self.directory, "lod", str(level), f"{index}.npz")
+        try:
+            with np.load(path) as data:
+                coords, parts = data["coords"], data["parts"]
+        except FileNotFoundError:
+            # One (polygon, start, stop) row per ring
+            rows, chunks, count = [], [], 0
+            for polygon, rings in enumerate(simplify_polygons(self.shape(name), 2.0 ** level)):
+                for ring in rings:
+                    rows.append((polygon, count, count + len(ring)))
+                    chunks.append(ring)
+                    count += len(ring)
+            coords = np.concatenate(chunks) if chunks else np.empty((0, 2))
+            parts = np.array(rows, dtype=np.int64).reshape(-1, 3)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp, coords=coords, parts=parts)
+            os.replace(tmp, path)
+
+        polygons = []
+        for polygon, start, stop in parts.tolist():
+            if polygon == len(polygons):
+                polygons.append([])
+            polygons[polygon].append(coords[start:stop])
+        self._lod[key] = polygons
+        return polygons
+
+    def precompute(self, level, names=None):
+        """Simplify names (all features by default) at level ahead of a batch of renders"""
+        for name in names or list(self.names):
+            self.shape(name, level)
+
+    def frame(self, names):
+        """A GeoDataFrame of the named features, for plotting with geopandas"""
+        import geopandas as gpd
+        from shapely.geometry import MultiPolygon, Polygon
+
+        geometries = [
+            MultiPolygon([Polygon(rings[0], rings[1:]) for rings in self.shape(name)])
+            for name in names
+        ]
+        properties = [self.feature(name)["properties"] for name in names]
+        return gpd.GeoDataFrame(properties, geometry=geometries)
+
+@lru_cache(maxsize=None)
+def open_store(source=None, directory=None, name_column="name"):
+    """The GeoStore for source, converting it first if its cache is missing or stale.
+
+    With no source, the Natural Earth countries are used; once they are
+    cached, opening them imports neither geopandas nor the dataset.
+    """
+    if directory is None:
+        stem = os.path.splitext(os.path.basename(source))[0] if source else NATURAL_EARTH
+        directory = os.path.join(GEODATA_DIR, stem)
+    index = _read_index(directory)
+    if index is not None and (source is None or index["stamp"] == _stamp(source, name_column)):
+        return GeoStore(directory, index)
+    build_cache(source or natural_earth_path(), directory, name_column)
+    return GeoStore(directory)
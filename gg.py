@@ -1,44 +1,46 @@
 
-from PIL import Image, ImageDraw, ImageFilter
+from PIL import Image, ImageDraw
 import math
 import random
-import colorsys
 import os
+import tracing
+from cache import RenderCache, render_key
+from derive import derive_rendered, save_derived
+from encode import EncodeQueue, save_image
+from hsv import hue_table
+from postfx import Blur, Pipeline, Vignette
+from strips import render_strips, write_png
+from vignette import apply_vignette
 
-# Create output directory
-os.makedirs("wallpapers", exist_ok=True)
+CACHE_MODULES = (__name__, "hsv", "postfx", "vignette", "strips")  # Hashed into cache keys
 
 # 4K vertical resolution
 WIDTH, HEIGHT = 2160, 3840
 CENTER = (WIDTH // 2, HEIGHT // 2)
+POST = Pipeline(Vignette(intensity=0.6), Blur(radius=1))
+BLUR_HALO = POST.halo  # Rows of context post-processing needs at strip edges
 
-def hsv2rgb(h, s, v):
-    return tuple(round(i * 255) for i in colorsys.hsv_to_rgb(h, s, v))
-
-def apply_radial_gradient(img, intensity=0.6):
-    gradient = Image.new("L", (WIDTH, HEIGHT), 0)
-    draw = ImageDraw.Draw(gradient)
-    for i in range(max(WIDTH, HEIGHT)):
-        opacity = int(255 * (1 - intensity * i / max(WIDTH, HEIGHT)))
-        draw.ellipse([
-            CENTER[0] - i, CENTER[1] - i,
-            CENTER[0] + i, CENTER[1] + i
-        ], fill=opacity)
-    black_overlay = Image.new("RGB", (WIDTH, HEIGHT), "black")
-    img.paste(black_overlay, (0, 0), gradient)
+def apply_radial_gradient(img, intensity=0.6, top=0):
+    apply_vignette(img, CENTER, intensity, (WIDTH, HEIGHT), top)
+
+def post_process(img, top=0):
+    """Vignette then soften in one banded pass; img may be a strip starting at row top"""
+    return POST(img, top, (WIDTH, HEIGHT))
 
 def design_radial_symmetry(draw):
     count = 60
     radius = 1400
     angle_step = 360 / count
+    colors = hue_table(count, 0.9, 1)
     for i in range(count):
         angle = math.radians(i * angle_step)
         x = CENTER[0] + radius * math.cos(angle)
         y = CENTER[1] + radius * math.sin(angle)
-        color = hsv2rgb(i / count, 0.9, 1)
+        color = colors[i]
         draw.ellipse([x - 30, y - 30, x + 30, y + 30], fill=color)
 
 def design_concentric_triangles(draw):
+    colors = hue_table(25, 0.7, 0.9)
     for i in range(1, 25):
         radius = i * 70
         points = []
@@ -47,31 +49,34 @@ def design_concentric_triangles(draw):
             x = CENTER[0] + radius * math.cos(theta)
             y = CENTER[1] + radius * math.sin(theta)
             points.append((x, y))
-        color = hsv2rgb(i / 25, 0.7, 0.9)
+        color = colors[i]
         draw.polygon(points, outline=color)
 
 def design_diagonal_stripes(draw):
     spacing = 150
+    colors = hue_table(360, 0.6, 0.9)
     for i in range(-WIDTH, WIDTH * 2, spacing):
-        color = hsv2rgb((i % 360) / 360, 0.6, 0.9)
+        color = colors[i % 360]
         draw.line([(i, 0), (i - HEIGHT, HEIGHT)], fill=color, width=30)
 
 def design_circular_grid(draw):
+    colors = hue_table(360, 1, 1)
     for r in range(200, int(math.hypot(WIDTH, HEIGHT)), 200):
         for angle in range(0, 360, 15):
             theta = math.radians(angle)
             x = CENTER[0] + r * math.cos(theta)
             y = CENTER[1] + r * math.sin(theta)
-            draw.ellipse([x - 15, y - 15, x + 15, y + 15], fill=hsv2rgb(angle / 360, 1, 1))
+            draw.ellipse([x - 15, y - 15, x + 15, y + 15], fill=colors[angle])
 
 def design_flower_pattern(draw):
     petals = 80
+    colors = hue_table(petals, 0.8, 1)
     for i in range(petals):
         theta = 2 * math.pi * i / petals
         r = 600 * math.sin(4 * theta)
         x = CENTER[0] + r * math.cos(theta)
         y = CENTER[1] + r * math.sin(theta)
-        color = hsv2rgb(i / petals, 0.8, 1)
+        color = colors[i]
         draw.ellipse([x - 20, y - 20, x + 20, y + 20], fill=color)
 
 # List of designs to generate
@@ -83,13 +88,55 @@ designs = [
     ("flower_pattern", design_flower_pattern),
 ]
 
+def render_design(design_func, file_path, strip_height=None, encoder=None, profiles=None):
+    with tracing.render(f"gg.{design_func.__name__}", size=(WIDTH, HEIGHT), strip_height=strip_height):
+        if strip_height:
+            strips = render_strips((WIDTH, HEIGHT), design_func, strip_height, halo=BLUR_HALO, post=post_process)
+            write_png(file_path, (WIDTH, HEIGHT), strips)
+            tracing.output(file_path)
+            if profiles:
+                with tracing.stage("derive"):
+                    derive_rendered(file_path, profiles, encoder=encoder)
+        else:
+            base = Image.new("RGB", (WIDTH, HEIGHT), "black")
+            draw = ImageDraw.Draw(base)
+            with tracing.stage("draw", WIDTH * HEIGHT):
+                design_func(draw)
+            base = post_process(base)
+            save_image(base, file_path, "JPEG", quality=95, encoder=encoder)
+            if profiles:
+                with tracing.stage("derive", WIDTH * HEIGHT):
+                    save_derived(base, file_path, profiles, "JPEG", quality=95, encoder=encoder)
+    return file_path
+
+def generate_design(name, file_path=None, strip_height=None, cache=None, encoder=None, profiles=None):
+    """Render one entry of designs and save it as a JPEG.
+
+    With strip_height the design is rendered in strips of that many rows and
+    streamed to a PNG instead, so memory no longer grows with WIDTH x HEIGHT.
+    With a RenderCache, unchanged designs are served from the cache. With an
+    EncodeQueue, the JPEG is written in the background and the function
+    returns as soon as the frame is rendered. profiles (names from
+    derive.DEVICE_PROFILES, or name -> size) also saves each device size
+    next to file_path, derived from the one render.
+    """
+    design_func = dict(designs)[name]
+    fmt = "png" if strip_height else "jpg"
+    if file_path is None:
+        os.makedirs("wallpapers", exist_ok=True)
+        file_path = f"wallpapers/geometric_4k_{name}.{fmt}"
+    if cache is None:
+        return render_design(design_func, file_path, strip_height, encoder, profiles)
+
+    key = render_key(CACHE_MODULES, {"design": name}, None, (WIDTH, HEIGHT), fmt)
+    return cache.render(key, fmt, lambda path: render_design(design_func, path, strip_height, encoder, profiles),
+                        file_path, encoder, profiles)
+
 # Generate and save wallpapers
-for name, design_func in designs:
-    base = Image.new("RGB", (WIDTH, HEIGHT), "black")
-    draw = ImageDraw.Draw(base)
-    design_func(draw)
-    apply_radial_gradient(base)
-    base = base.filter(ImageFilter.GaussianBlur(radius=1))
-    file_path = f"wallpapers/geometric_4k_{name}.jpg"
-    base.save(file_path, "JPEG", quality=95)
-    print(f"Wallpaper saved: {file_path}")
+if __name__ == "__main__":
+    cache = RenderCache()
+    with EncodeQueue() as encoder:
+        for name, design_func in designs:
+            file_path = generate_design(name, cache=cache, encoder=encoder)
+            print(f"Wallpaper rendered: {file_path}")
+    print("All wallpapers saved")
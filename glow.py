@@ -0,0 +1,31 @@
+from PIL import Image, ImageDraw
+
+def draw_glow(img, x, y, radius, color, rings=10, alpha_step=5, offset=0):
+    """Composite a soft circular glow onto img in place.
+
+    Only the glow's bounding box is cropped, blended and pasted back, so the
+    cost scales with the glow size rather than the full frame. x and y are
+    frame coordinates; offset is the frame row at the top of img when img is
+    a strip.
+    """
+    left = max(0, int(x - radius))
+    top = max(0, int(y - radius) - offset)
+    right = min(img.width, int(x + radius) + 2)
+    bottom = min(img.height, int(y + radius) + 2 - offset)
+    if left >= right or top >= bottom:
+        return
+
+    box = (left, top, right, bottom)
+    glow = Image.new('RGBA', (right - left, bottom - top), (0, 0, 0, 0))
+    glow_draw = ImageDraw.Draw(glow)
+    # Truncate in frame coordinates, as drawing on the full frame would
+    dx, dy = left, top + offset
+    for i in range(rings, 0, -1):
+        r = radius * i / rings
+        glow_draw.ellipse(
+            (int(x - r) - dx, int(y - r) - dy, int(x + r) - dx, int(y + r) - dy),
+            fill=(color[0], color[1], color[2], alpha_step * i)
+        )
+
+    region = Image.alpha_composite(img.crop(box).convert('RGBA'), glow)
+    img.paste(region.convert(img.mode), box)
@@ -0,0 +1,32 @@
+from functools import lru_cache
+import colorsys
+import numpy as np
+
+def hsv_to_rgb_array(h, s, v):
+    """Vectorized colorsys.hsv_to_rgb: broadcast h, s, v to an (..., 3) float array"""
+    h, s, v = np.broadcast_arrays(*(np.asarray(c, dtype=np.float64) for c in (h, s, v)))
+    i = np.floor(h * 6.0)
+    f = h * 6.0 - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i.astype(np.int64) % 6
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    return np.stack([r, g, b], axis=-1)
+
+def hsv2rgb_array(h, s, v):
+    """Convert HSV arrays to RGB (0-255) as a uint8 (..., 3) array"""
+    return np.round(hsv_to_rgb_array(h, s, v) * 255).astype(np.uint8)
+
+@lru_cache(maxsize=4096)
+def hsv2rgb(h, s, v):
+    """Convert HSV to RGB (0-255)"""
+    return tuple(round(i * 255) for i in colorsys.hsv_to_rgb(h, s, v))
+
+@lru_cache(maxsize=256)
+def hue_table(count, s, v):
+    """RGB tuples for hues 0/count, 1/count, ... count/count at fixed s and v"""
+    hues = np.arange(count + 1) / count
+    return tuple(map(tuple, hsv2rgb_array(hues, s, v).tolist()))
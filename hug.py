@@ -1,20 +1,33 @@
-
-from huggingface_hub import InferenceClient
 from PIL import Image
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import asyncio
 import datetime
 import os
 
 # Use a high-quality model
-client = InferenceClient(model="stabilityai/sdxl-turbo")  # You can try other models too
+MODEL = "stabilityai/sdxl-turbo"  # You can try other models too
+
+@lru_cache(maxsize=None)
+def inference_client(model=MODEL):
+    """The client for model, created on first use so importing hug stays cheap"""
+    from huggingface_hub import InferenceClient
+    return InferenceClient(model=model)
+
+def save_wallpaper(image, file_path):
+    # Convert to RGB (in case image is in RGBA)
+    image = image.convert("RGB")
+    image.save(file_path, "JPEG", quality=95)
+    return file_path
 
 def generate_wallpaper(prompt, output_dir="wallpapers", width=1024, height=1024):
     os.makedirs(output_dir, exist_ok=True)
 
     print(f"Generating: {prompt}")
-    
+
     # Generate image using Hugging Face hosted model
-    response = client.text_to_image(
+    response = inference_client().text_to_image(
         prompt,
         width=width,
         height=height,
@@ -25,12 +38,87 @@ def generate_wallpaper(prompt, output_dir="wallpapers", width=1024, height=1024)
     # Save as JPEG
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     file_path = f"{output_dir}/wallpaper_{timestamp}.jpeg"
+    save_wallpaper(response, file_path)
 
-    # Convert to RGB (in case image is in RGBA)
-    image = response.convert("RGB")
-    image.save(file_path, "JPEG", quality=95)
+    print(f"Saved as {file_path}")
+    return file_path
 
+def _status(error):
+    # aiohttp errors carry .status, requests and httpx errors a .response
+    status = getattr(error, "status", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def is_transient(error):
+    """Whether a failed request may succeed on retry: timeouts, dropped connections, 429 and 5xx responses"""
+    status = _status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    transient = [TimeoutError, ConnectionError]
+    try:
+        import aiohttp
+        transient.append(aiohttp.ClientConnectionError)
+    except ImportError:
+        pass
+    try:
+        import httpx
+        transient.append(httpx.TransportError)
+    except ImportError:
+        pass
+    return isinstance(error, tuple(transient))
+
+async def _generate_one(client, limit, pool, prompt, file_path, width, height, retries, backoff):
+    async with limit:
+        for attempt in range(retries + 1):
+            try:
+                print(f"Generating: {prompt}")
+                response = await client.text_to_image(
+                    prompt,
+                    width=width,
+                    height=height,
+                    guidance_scale=7.5,
+                    num_inference_steps=25
+                )
+                break
+            except Exception as e:
+                if attempt == retries or not is_transient(e):
+                    raise
+                delay = backoff * 2 ** attempt
+                print(f"Retrying {prompt!r} in {delay:.1f}s after: {e}")
+                await asyncio.sleep(delay)
+
+    # Decode and encode off the event loop, after the request slot is released
+    await asyncio.get_running_loop().run_in_executor(pool, save_wallpaper, response, file_path)
     print(f"Saved as {file_path}")
+    return file_path
+
+async def generate_wallpapers(prompts, output_dir="wallpapers", width=1024, height=1024,
+                              concurrency=4, retries=3, backoff=1.0, model=MODEL, save_workers=2):
+    """Generate one wallpaper per prompt with at most concurrency requests in flight.
+
+    Transient failures (see is_transient) are retried with exponential
+    backoff; other errors, such as a bad token, fail at once. Images are
+    saved on a thread pool while other requests are still waiting on the
+    network.
+    model may be a hosted model id or the URL of a local inference server.
+    Returns a list with the saved path, or the exception, for each prompt.
+    """
+    from huggingface_hub import AsyncInferenceClient
+
+    os.makedirs(output_dir, exist_ok=True)
+    limit = asyncio.Semaphore(concurrency)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    async with AsyncInferenceClient(model=model) as async_client:
+        with ThreadPoolExecutor(max_workers=save_workers) as pool:
+            return await asyncio.gather(*(
+                _generate_one(async_client, limit, pool, prompt,
+                              f"{output_dir}/wallpaper_{timestamp}_{i:04d}.jpeg",
+                              width, height, retries, backoff)
+                for i, prompt in enumerate(prompts)
+            ), return_exceptions=True)
 
-# Example prompt
-generate_wallpaper("A fantasy forest with glowing mushrooms and waterfalls, ultra detailed, 4k")
+if __name__ == "__main__":
+    # Example prompt
+    generate_wallpaper("A fantasy forest with glowing mushrooms and waterfalls, ultra detailed, 4k")
@@ -1,20 +1,30 @@
-import matplotlib.pyplot as plt
-import geopandas as gpd
-import folium
-from folium import plugins
-import requests
-import json
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+import os
+import re
+import zlib
+import tracing
+from derive import DEVICE_PROFILES
+from encode import save_image
+from geodata import lod_level, open_store
+from hsv import hsv2rgb
+
+# matplotlib, geopandas and folium take seconds to import, so each map
+# imports only what it draws with
 
 # Method 1: Using GeoPandas with Natural Earth data
-def create_nigeria_map_geopandas():
+def create_nigeria_map_geopandas(store=None):
     """
     Create a map of Nigeria using GeoPandas and Natural Earth data
+
+    The world dataset is converted to a local geodata cache on first use;
+    after that only Nigeria's rows are loaded from it.
     """
-    # Download world map data
-    world = gpd.read_file(gpd.datasets.get_path('naturalearth_lowres'))
-    
-    # Filter for Nigeria
-    nigeria = world[world.name == 'Nigeria']
+    import matplotlib.pyplot as plt
+
+    # Nigeria from the cached world map data
+    nigeria = (store or open_store()).frame(['Nigeria'])
     
     # Create the plot
     fig, ax = plt.subplots(figsize=(12, 8))
@@ -40,6 +50,8 @@ def create_nigeria_interactive_map():
     """
     Create an interactive map of Nigeria using Folium
     """
+    import folium
+
     # Nigeria's approximate center coordinates
     nigeria_center = [9.0820, 8.6753]
     
@@ -92,6 +104,8 @@ def create_detailed_nigeria_map():
     """
     Create a detailed map of Nigeria with state boundaries
     """
+    import matplotlib.pyplot as plt
+
     try:
         # URL for Nigeria administrative boundaries (states)
         url = "https://raw.githubusercontent.com/holtzy/D3-graph-gallery/master/DATA/world.geojson"
@@ -179,6 +193,8 @@ def create_simple_nigeria_outline():
     """
     Create a simple outline map of Nigeria using approximate coordinates
     """
+    import matplotlib.pyplot as plt
+
     # Approximate Nigeria boundary coordinates
     nigeria_outline = [
         [2.69, 6.26], [2.76, 9.23], [3.32, 11.99], [3.84, 13.85],
@@ -231,6 +247,111 @@ def create_simple_nigeria_outline():
     
     return fig
 
+# Method 5: Headless wallpaper rasters from the geodata cache
+MAP_DPI = 100
+MAP_BACKGROUND = (15, 15, 25)
+MAP_NEIGHBOR = (38, 38, 56)
+MAP_PADDING = 0.15  # Fraction of the frame's width left on each side of the region
+
+def _mpl_color(rgb):
+    return tuple(channel / 255 for channel in rgb)
+
+@lru_cache(maxsize=None)
+def _map_figure(size):
+    """
+    One off-screen Agg figure per wallpaper size, reused by every render in the process
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(size[0] / MAP_DPI, size[1] / MAP_DPI), dpi=MAP_DPI,
+                 facecolor=_mpl_color(MAP_BACKGROUND))
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    return fig, ax
+
+def _region_patch(polygons, **style):
+    """
+    All rings of a feature as one patch, so holes stay unfilled
+    """
+    from matplotlib.patches import PathPatch
+    from matplotlib.path import Path
+
+    path = Path.make_compound_path(*(Path(ring, closed=True) for rings in polygons for ring in rings))
+    return PathPatch(path, **style)
+
+def _fit_limits(bbox, size):
+    """
+    Axis limits centering bbox in a frame of size, keeping degrees square
+    """
+    minx, miny, maxx, maxy = bbox
+    aspect = size[0] / size[1]
+    width = max(maxx - minx, (maxy - miny) * aspect) * (1 + 2 * MAP_PADDING)
+    height = width / aspect
+    cx, cy = (minx + maxx) / 2, (miny + maxy) / 2
+    return (cx - width / 2, cx + width / 2), (cy - height / 2, cy + height / 2)
+
+def render_region(region, file_path=None, size='phone', source=None, neighbors=True, encoder=None, lod=True):
+    """
+    Render one region of the geodata cache straight to a wallpaper-sized image
+
+    Draws on a reused off-screen Agg figure, so no display is needed. The
+    region is filled with a hue derived from its name; with neighbors, the
+    features around it are drawn faintly for context. size is (width,
+    height) or a derive.DEVICE_PROFILES name. With an EncodeQueue the PNG
+    is written in the background. With lod, outlines are simplified to the
+    coarsest cached level that stays under half a pixel at this size.
+    """
+    if isinstance(size, str):
+        size = DEVICE_PROFILES[size]
+    size = tuple(size)
+    store = open_store(source)
+    if file_path is None:
+        os.makedirs('wallpapers/maps', exist_ok=True)
+        slug = re.sub(r'\W+', '_', region).strip('_').lower()
+        file_path = f'wallpapers/maps/{slug}_{size[0]}x{size[1]}.png'
+
+    with tracing.render('map.region', size=size, region=region):
+        fig, ax = _map_figure(size)
+        for patch in list(ax.patches):
+            patch.remove()
+        xlim, ylim = _fit_limits(store.bbox(region), size)
+        level = lod_level((xlim[1] - xlim[0]) / size[0]) if lod else None
+
+        with tracing.stage('draw', size[0] * size[1]):
+            if neighbors:
+                for name in store.query((xlim[0], ylim[0], xlim[1], ylim[1])):
+                    if name != region:
+                        ax.add_artist(_region_patch(store.shape(name, level), facecolor=_mpl_color(MAP_NEIGHBOR),
+                                                   edgecolor=_mpl_color(MAP_BACKGROUND), linewidth=0.8))
+            color = hsv2rgb(zlib.crc32(region.encode()) / 2 ** 32, 0.6, 0.9)
+            ax.add_artist(_region_patch(store.shape(region, level), facecolor=_mpl_color(color),
+                                       edgecolor='white', linewidth=2))
+            # add_artist rather than add_patch: the limits are set here, so
+            # fitting them to every vertex would be wasted work
+            ax.set_xlim(*xlim)
+            ax.set_ylim(*ylim)
+            fig.canvas.draw()
+            img = Image.frombuffer('RGBA', size, fig.canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1).convert('RGB')
+        save_image(img, file_path, encoder=encoder)
+    return file_path
+
+def render_regions(regions, size='phone', source=None, neighbors=True, workers=None):
+    """
+    Render many regions across a process pool; returns their paths in order
+
+    Regions are handed out in chunks, so each worker opens the geodata
+    cache and builds its figure once and reuses them for its whole chunk.
+    """
+    regions = list(regions)
+    workers = workers or os.cpu_count()
+    # Convert the source once here rather than racing to in every worker
+    open_store(source)
+    render = partial(render_region, size=size, source=source, neighbors=neighbors)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render, regions, chunksize=max(1, len(regions) // (workers * 4))))
+
 # Main execution
 if __name__ == "__main__":
     print("Creating Nigeria Maps...")
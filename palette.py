@@ -0,0 +1,44 @@
+from PIL import Image
+import numpy as np
+
+def indexed_image(indices, colors):
+    """Build a "P" image from a 2-D array of indices into colors.
+
+    The palette holds exactly len(colors) entries, so PNG output drops to
+    1, 2 or 4 bits per pixel for small palettes.
+    """
+    img = Image.fromarray(np.asarray(indices, dtype=np.uint8), 'P')
+    img.putpalette([channel for color in colors for channel in color])
+    return img
+
+def detect_palette(img, max_colors=256):
+    """The distinct colors of an RGB image, most used first, or None if there are more than max_colors"""
+    counts = img.getcolors(max_colors)
+    if counts is None:
+        return None
+    return [color for _, color in sorted(counts, reverse=True)]
+
+def to_palette(img, colors=None, max_colors=256):
+    """Convert an RGB image to "P" mode without changing any pixel.
+
+    colors declares the palette; otherwise it is detected. Images with
+    more than max_colors colors, or with colors missing from the declared
+    palette, are returned unchanged.
+    """
+    if img.mode != 'RGB':
+        return img
+    if colors is None:
+        colors = detect_palette(img, max_colors)
+        if colors is None:
+            return img
+    if len(colors) > 256:
+        return img
+    # Exact lookup of each packed 0xRRGGBB value; quantize() matches colors only approximately
+    rgb = np.asarray(img, dtype=np.uint32)
+    packed = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    keys = np.array([(r << 16) | (g << 8) | b for r, g, b in colors], dtype=np.uint32)
+    order = np.argsort(keys, kind='stable')
+    positions = np.searchsorted(keys[order], packed).clip(0, len(keys) - 1)
+    if not np.array_equal(keys[order][positions], packed):
+        return img
+    return indexed_image(order[positions], colors)
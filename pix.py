@@ -1,58 +1,170 @@
 
 from PIL import Image, ImageDraw
+import numpy as np
 import random
 import math
+import colorsys
+import time
+from functools import lru_cache
+from hsv import hsv_to_rgb_array
+import tracing
+from encode import EncodeQueue, save_image
 
 # Common settings for mobile wallpapers
 WIDTH, HEIGHT = 1080, 1920  # Standard mobile wallpaper size
 PIXEL_SIZE = 20  # Size of each "pixel" in the art
 OUTPUT_PREFIX = "pixel_wallpaper_"
 
-def create_pixel_art_wallpapers():
+# Designs drawn straight into a "P" canvas: every fill is an exact color,
+# which Pillow gives its own palette entry, so no conversion pass is needed.
+# Digital rain (5) has antialiased text and abstract pixels (10) more than
+# 256 colors, so both are drawn in RGB.
+INDEXED_DESIGNS = {1, 2, 3, 4, 6, 7, 8, 9}
+DIGITAL_RAIN = 5
+
+MOUNTAIN_COLORS = [(30, 60, 110), (50, 90, 150), (80, 130, 200), (150, 200, 240)]
+BLOCK_TYPES = [
+    {"color": (100, 150, 70), "size": 1},  # Grass
+    {"color": (130, 100, 60), "size": 1},  # Dirt
+    {"color": (80, 80, 80), "size": 1},   # Stone
+    {"color": (100, 100, 255), "size": 2}  # Diamond (larger)
+]
+
+SPACE_INVADER = (
+    (0,0,1,0,0,0,0,0,1,0,0),
+    (0,0,0,1,0,0,0,1,0,0,0),
+    (0,0,1,1,1,1,1,1,1,0,0),
+    (0,1,1,0,1,1,1,0,1,1,0),
+    (1,1,1,1,1,1,1,1,1,1,1),
+    (1,0,1,1,1,1,1,1,1,0,1),
+    (1,0,1,0,0,0,0,0,1,0,1),
+    (0,0,0,1,1,0,1,1,0,0,0)
+)
+PIXEL_HEART = (
+    (0,1,1,0,1,1,0),
+    (1,1,1,1,1,1,1),
+    (1,1,1,1,1,1,1),
+    (0,1,1,1,1,1,0),
+    (0,0,1,1,1,0,0),
+    (0,0,0,1,0,0,0)
+)
+
+@lru_cache(maxsize=None)
+def sprite_mask(pattern, pixel_size):
+    """Rasterize a 0/1 pattern once; draw.bitmap then stamps it in one call"""
+    mask = Image.new('1', (len(pattern[0]) * pixel_size + 1, len(pattern) * pixel_size + 1), 0)
+    draw = ImageDraw.Draw(mask)
+    for row in range(len(pattern)):
+        for col in range(len(pattern[0])):
+            if pattern[row][col]:
+                draw.rectangle([
+                    col*pixel_size,
+                    row*pixel_size,
+                    (col+1)*pixel_size,
+                    (row+1)*pixel_size
+                ], fill=1)
+    return mask
+
+def draw_wallpaper(img, draw, wallpaper_num, grid_mode=True, rng=random):
+    # Each wallpaper has a different design, drawing its randomness from rng
+    if wallpaper_num == 1:
+        # 1. Classic 8-bit mountains
+        if grid_mode:
+            paste_grid(img, grid_pixel_mountains())
+        else:
+            draw_pixel_mountains(draw)
+    elif wallpaper_num == 2:
+        # 2. Space invaders theme
+        draw_space_invaders(draw)
+    elif wallpaper_num == 3:
+        # 3. Pixel heart grid
+        draw_pixel_hearts(draw, rng)
+    elif wallpaper_num == 4:
+        # 4. Retro game landscape
+        draw_retro_landscape(draw)
+    elif wallpaper_num == 5:
+        # 5. Digital rain (Matrix style); seeded runs take the scroll position
+        # from rng instead of the clock so they can be reproduced
+        draw_digital_rain(draw, rng, None if rng is random else rng.uniform(0, 3600))
+    elif wallpaper_num == 6:
+        # 6. Pixel sunset
+        draw_pixel_sunset(draw)
+    elif wallpaper_num == 7:
+        # 7. Minecraft-inspired blocks
+        if grid_mode:
+            paste_grid(img, grid_minecraft_blocks(rng))
+        else:
+            draw_minecraft_blocks(draw, rng)
+    elif wallpaper_num == 8:
+        # 8. Pixel city skyline
+        draw_pixel_city(draw, rng)
+    elif wallpaper_num == 9:
+        # 9. Pixel ocean waves
+        draw_pixel_ocean(draw, rng)
+    else:
+        # 10. Abstract pixel art
+        if grid_mode:
+            paste_grid(img, grid_abstract_pixels(rng))
+        else:
+            draw_abstract_pixels(draw, rng)
+
+def create_pixel_art_wallpapers(grid_mode=True, encoder=None, palette=True, compress_level=6, dedup=None):
+    """Draw and save all 10 designs as PNGs.
+
+    With palette=True, every design but abstract pixels is saved as an
+    indexed PNG, which is several times smaller and faster to encode.
+    compress_level trades zlib time for size (0-9). With a
+    dedup.DedupIndex, near-duplicates of indexed wallpapers are skipped.
+    """
+    if encoder is None:
+        # Encode each PNG while the next wallpaper is drawn
+        with EncodeQueue() as encoder:
+            return create_pixel_art_wallpapers(grid_mode, encoder, palette, compress_level, dedup)
+
+    saved = 0
     for wallpaper_num in range(1, 11):
+        if generate_pixel_wallpaper(wallpaper_num, None, grid_mode, encoder, palette, compress_level,
+                                    dedup=dedup):
+            saved += 1
+    
+    print(f"Generated {saved} pixel art wallpapers!")
+
+def generate_pixel_wallpaper(wallpaper_num, file_path=None, grid_mode=True, encoder=None, palette=True,
+                             compress_level=6, rng=random, dedup=None):
+    """Draw and save one of the 10 designs, numbered as in draw_wallpaper.
+
+    rng is the random.Random the design draws from; pass a seeded one to
+    make the wallpaper reproducible independently of other renders. With a
+    dedup.DedupIndex, a near-duplicate of an indexed wallpaper is not
+    encoded or written, and None is returned.
+    """
+    if file_path is None:
+        file_path = f"{OUTPUT_PREFIX}{wallpaper_num}.png"
+    with tracing.render(f"pix.{wallpaper_num}", size=(WIDTH, HEIGHT), grid_mode=grid_mode):
         # Create new image
-        img = Image.new('RGB', (WIDTH, HEIGHT), (0, 0, 0))
+        mode = 'P' if palette and wallpaper_num in INDEXED_DESIGNS else 'RGB'
+        img = Image.new(mode, (WIDTH, HEIGHT), (0, 0, 0))
         draw = ImageDraw.Draw(img)
-        
-        # Each wallpaper has a different design
-        if wallpaper_num == 1:
-            # 1. Classic 8-bit mountains
-            draw_pixel_mountains(draw)
-        elif wallpaper_num == 2:
-            # 2. Space invaders theme
-            draw_space_invaders(draw)
-        elif wallpaper_num == 3:
-            # 3. Pixel heart grid
-            draw_pixel_hearts(draw)
-        elif wallpaper_num == 4:
-            # 4. Retro game landscape
-            draw_retro_landscape(draw)
-        elif wallpaper_num == 5:
-            # 5. Digital rain (Matrix style)
-            draw_digital_rain(draw)
-        elif wallpaper_num == 6:
-            # 6. Pixel sunset
-            draw_pixel_sunset(draw)
-        elif wallpaper_num == 7:
-            # 7. Minecraft-inspired blocks
-            draw_minecraft_blocks(draw)
-        elif wallpaper_num == 8:
-            # 8. Pixel city skyline
-            draw_pixel_city(draw)
-        elif wallpaper_num == 9:
-            # 9. Pixel ocean waves
-            draw_pixel_ocean(draw)
-        else:
-            # 10. Abstract pixel art
-            draw_abstract_pixels(draw)
-        
+
+        with tracing.stage("draw", WIDTH * HEIGHT):
+            draw_wallpaper(img, draw, wallpaper_num, grid_mode, rng)
+
+        if palette and wallpaper_num == DIGITAL_RAIN:
+            # Every pixel is (0, g, 0), so the green channel is an exact palette index
+            from rain import paletted
+            img = paletted(img.getchannel('G'))
+
+        if dedup is not None:
+            with tracing.stage("dedup"):
+                if not dedup.admit(img, file_path):
+                    return None
+
         # Save the image
-        img.save(f"{OUTPUT_PREFIX}{wallpaper_num}.png")
-    
-    print("Generated 10 pixel art wallpapers!")
+        save_image(img, file_path, encoder=encoder, compress_level=compress_level)
+    return file_path
 
 def draw_pixel_mountains(draw):
-    colors = [(30, 60, 110), (50, 90, 150), (80, 130, 200), (150, 200, 240)]
+    colors = MOUNTAIN_COLORS
     for y in range(0, HEIGHT, PIXEL_SIZE):
         for x in range(0, WIDTH, PIXEL_SIZE):
             height_factor = 1 - (y / HEIGHT)
@@ -73,56 +185,20 @@ def draw_space_invaders(draw):
             draw_space_invader(draw, x, y, color)
 
 def draw_space_invader(draw, x, y, color):
-    pattern = [
-        [0,0,1,0,0,0,0,0,1,0,0],
-        [0,0,0,1,0,0,0,1,0,0,0],
-        [0,0,1,1,1,1,1,1,1,0,0],
-        [0,1,1,0,1,1,1,0,1,1,0],
-        [1,1,1,1,1,1,1,1,1,1,1],
-        [1,0,1,1,1,1,1,1,1,0,1],
-        [1,0,1,0,0,0,0,0,1,0,1],
-        [0,0,0,1,1,0,1,1,0,0,0]
-    ]
-    
-    for row in range(len(pattern)):
-        for col in range(len(pattern[0])):
-            if pattern[row][col]:
-                draw.rectangle([
-                    x + col*PIXEL_SIZE, 
-                    y + row*PIXEL_SIZE, 
-                    x + (col+1)*PIXEL_SIZE, 
-                    y + (row+1)*PIXEL_SIZE
-                ], fill=color)
+    draw.bitmap((x, y), sprite_mask(SPACE_INVADER, PIXEL_SIZE), fill=color)
 
-def draw_pixel_hearts(draw):
+def draw_pixel_hearts(draw, rng=random):
     bg_color = (250, 240, 230)
     heart_colors = [(255, 100, 100), (255, 150, 150), (255, 200, 200)]
     draw.rectangle([0, 0, WIDTH, HEIGHT], fill=bg_color)
     
     for y in range(0, HEIGHT, PIXEL_SIZE * 5):
         for x in range(0, WIDTH, PIXEL_SIZE * 5):
-            color = random.choice(heart_colors)
+            color = rng.choice(heart_colors)
             draw_pixel_heart(draw, x, y, color)
 
 def draw_pixel_heart(draw, x, y, color):
-    pattern = [
-        [0,1,1,0,1,1,0],
-        [1,1,1,1,1,1,1],
-        [1,1,1,1,1,1,1],
-        [0,1,1,1,1,1,0],
-        [0,0,1,1,1,0,0],
-        [0,0,0,1,0,0,0]
-    ]
-    
-    for row in range(len(pattern)):
-        for col in range(len(pattern[0])):
-            if pattern[row][col]:
-                draw.rectangle([
-                    x + col*PIXEL_SIZE, 
-                    y + row*PIXEL_SIZE, 
-                    x + (col+1)*PIXEL_SIZE, 
-                    y + (row+1)*PIXEL_SIZE
-                ], fill=color)
+    draw.bitmap((x, y), sprite_mask(PIXEL_HEART, PIXEL_SIZE), fill=color)
 
 def draw_retro_landscape(draw):
     # Sky gradient
@@ -141,20 +217,22 @@ def draw_retro_landscape(draw):
         draw.rectangle([x-10, HEIGHT//2-100, x+10, HEIGHT//2], fill=(100, 70, 40))
         draw.polygon([x-50, HEIGHT//2-100, x, HEIGHT//2-250, x+50, HEIGHT//2-100], fill=(0, 100, 0))
 
-def draw_digital_rain(draw):
+def draw_digital_rain(draw, rng=random, now=None):
     chars = ["0", "1"]
     font_size = PIXEL_SIZE
     bg_color = (0, 0, 0)
     text_color = (0, 255, 0)
     
     draw.rectangle([0, 0, WIDTH, HEIGHT], fill=bg_color)
+    if now is None:
+        now = time.time()
     
     for x in range(0, WIDTH, font_size):
-        length = random.randint(5, 20)
-        speed = random.randint(1, 3)
+        length = rng.randint(5, 20)
+        speed = rng.randint(1, 3)
         for i in range(length):
-            y_pos = (HEIGHT + i * font_size - int(time.time() * speed * 10)) % HEIGHT
-            char = random.choice(chars)
+            y_pos = (HEIGHT + i * font_size - int(now * speed * 10)) % HEIGHT
+            char = rng.choice(chars)
             brightness = max(50, 255 - (i * 255 // length))
             color = (0, brightness, 0)
             draw.text((x, y_pos), char, fill=color)
@@ -172,17 +250,12 @@ def draw_pixel_sunset(draw):
     # Sun
     draw.ellipse([WIDTH//2-150, HEIGHT//3-150, WIDTH//2+150, HEIGHT//3+150], fill=(255, 240, 150))
 
-def draw_minecraft_blocks(draw):
-    block_types = [
-        {"color": (100, 150, 70), "size": 1},  # Grass
-        {"color": (130, 100, 60), "size": 1},  # Dirt
-        {"color": (80, 80, 80), "size": 1},   # Stone
-        {"color": (100, 100, 255), "size": 2}  # Diamond (larger)
-    ]
+def draw_minecraft_blocks(draw, rng=random):
+    block_types = BLOCK_TYPES
     
     for y in range(0, HEIGHT, PIXEL_SIZE):
         for x in range(0, WIDTH, PIXEL_SIZE):
-            block = random.choice(block_types)
+            block = rng.choice(block_types)
             size = block["size"]
             draw.rectangle([
                 x, y,
@@ -190,32 +263,32 @@ def draw_minecraft_blocks(draw):
                 y + PIXEL_SIZE*size
             ], fill=block["color"])
 
-def draw_pixel_city(draw):
+def draw_pixel_city(draw, rng=random):
     # Night sky
     draw.rectangle([0, 0, WIDTH, HEIGHT], fill=(10, 10, 30))
     
     # Stars
     for _ in range(200):
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT//2)
-        size = random.randint(1, 3)
+        x = rng.randint(0, WIDTH)
+        y = rng.randint(0, HEIGHT//2)
+        size = rng.randint(1, 3)
         draw.ellipse([x, y, x+size, y+size], fill=(255, 255, 255))
     
     # Buildings
     building_colors = [(20, 20, 60), (30, 30, 80), (40, 40, 100)]
     for x in range(0, WIDTH, 100):
-        width = random.randint(50, 150)
-        height = random.randint(200, 600)
-        color = random.choice(building_colors)
+        width = rng.randint(50, 150)
+        height = rng.randint(200, 600)
+        color = rng.choice(building_colors)
         draw.rectangle([x, HEIGHT-height, x+width, HEIGHT], fill=color)
         
         # Windows
         for wy in range(HEIGHT-height+20, HEIGHT-20, 30):
             for wx in range(x+10, x+width-10, 30):
-                if random.random() > 0.3:  # 70% chance of a light being on
+                if rng.random() > 0.3:  # 70% chance of a light being on
                     draw.rectangle([wx, wy, wx+15, wy+15], fill=(255, 255, 150))
 
-def draw_pixel_ocean(draw):
+def draw_pixel_ocean(draw, rng=random):
     # Water gradient
     for y in range(0, HEIGHT, PIXEL_SIZE):
         blue_green = min(255, 50 + int(200 * (y / HEIGHT)))
@@ -223,7 +296,7 @@ def draw_pixel_ocean(draw):
     
     # Waves
     for x in range(0, WIDTH, 40):
-        wave_height = random.randint(5, 15)
+        wave_height = rng.randint(5, 15)
         draw.arc([
             x, HEIGHT//2-wave_height,
             x+80, HEIGHT//2+wave_height
@@ -231,23 +304,73 @@ def draw_pixel_ocean(draw):
     
     # Fish
     for _ in range(10):
-        x = random.randint(0, WIDTH)
-        y = random.randint(HEIGHT//2, HEIGHT-100)
-        size = random.randint(20, 40)
-        color = (random.randint(150, 255), random.randint(50, 150), 50)
+        x = rng.randint(0, WIDTH)
+        y = rng.randint(HEIGHT//2, HEIGHT-100)
+        size = rng.randint(20, 40)
+        color = (rng.randint(150, 255), rng.randint(50, 150), 50)
         draw.ellipse([x, y, x+size, y+size//2], fill=color)
         draw.polygon([x+size, y+size//4, x+size+size//2, y, x+size+size//2, y+size//2], fill=color)
 
-def draw_abstract_pixels(draw):
+def draw_abstract_pixels(draw, rng=random):
     for y in range(0, HEIGHT, PIXEL_SIZE):
         for x in range(0, WIDTH, PIXEL_SIZE):
-            if random.random() > 0.7:  # 30% chance of a colored pixel
-                hue = random.random()
-                saturation = 0.7 + random.random() * 0.3
-                value = 0.8 + random.random() * 0.2
+            if rng.random() > 0.7:  # 30% chance of a colored pixel
+                hue = rng.random()
+                saturation = 0.7 + rng.random() * 0.3
+                value = 0.8 + rng.random() * 0.2
                 r, g, b = [int(c * 255) for c in colorsys.hsv_to_rgb(hue, saturation, value)]
                 draw.rectangle([x, y, x+PIXEL_SIZE, y+PIXEL_SIZE], fill=(r, g, b))
 
+# Grid mode: compute one color per PIXEL_SIZE cell as a NumPy array, then
+# expand it to full size with a single nearest-neighbour resize.
+
+def _grid_coords():
+    ys = np.arange(0, HEIGHT, PIXEL_SIZE)[:, None]
+    xs = np.arange(0, WIDTH, PIXEL_SIZE)[None, :]
+    return ys, xs
+
+def _numpy_rng(rng=random):
+    # Seed from rng so random.seed(), or a seeded random.Random, keeps grid output reproducible
+    return np.random.default_rng(rng.getrandbits(64))
+
+def paste_grid(img, grid):
+    """Scale a (rows, cols, 3) cell-color array up by PIXEL_SIZE onto img, which may be "P" """
+    rows, cols = grid.shape[:2]
+    if img.mode == 'P':
+        # Index the few distinct cell colors in img's palette, adding any it lacks
+        colors, inverse = np.unique(grid.reshape(-1, 3), axis=0, return_inverse=True)
+        lut = np.array([img.palette.getcolor(tuple(map(int, color)), img) for color in colors], dtype=np.uint8)
+        cells = Image.fromarray(lut[inverse.reshape(rows, cols)], 'P')
+    else:
+        cells = Image.fromarray(np.ascontiguousarray(grid, dtype=np.uint8), "RGB")
+    img.paste(cells.resize((cols * PIXEL_SIZE, rows * PIXEL_SIZE), Image.NEAREST), (0, 0))
+
+def grid_pixel_mountains():
+    colors = np.array(MOUNTAIN_COLORS, dtype=np.uint8)
+    ys, xs = _grid_coords()
+    height_factor = 1 - (ys / HEIGHT)
+    noise = np.sin(xs * 0.01) * 0.2 + np.cos(ys * 0.005) * 0.1
+    mountain_level = np.trunc(height_factor * 4 + noise * 4).astype(int) % len(colors)
+    return colors[mountain_level]
+
+def grid_minecraft_blocks(rng=random):
+    # Overflow from the double-size diamond is always painted over by the
+    # following cells, so every block occupies exactly one cell.
+    colors = np.array([block["color"] for block in BLOCK_TYPES], dtype=np.uint8)
+    ys, xs = _grid_coords()
+    return colors[_numpy_rng(rng).integers(len(colors), size=(ys.shape[0], xs.shape[1]))]
+
+def grid_abstract_pixels(rng=random):
+    rng = _numpy_rng(rng)
+    ys, xs = _grid_coords()
+    shape = (ys.shape[0], xs.shape[1])
+    lit = rng.random(shape) > 0.7  # 30% chance of a colored pixel
+    hue = rng.random(shape)
+    saturation = 0.7 + rng.random(shape) * 0.3
+    value = 0.8 + rng.random(shape) * 0.2
+    rgb = (hsv_to_rgb_array(hue, saturation, value) * 255).astype(np.uint8)
+    rgb[~lit] = 0
+    return rgb
+
 if __name__ == "__main__":
-    import time
     create_pixel_art_wallpapers()
@@ -0,0 +1,129 @@
+"""Digital rain animation for live wallpapers.
+
+DigitalRain keeps each column's trail between frames and redraws only the
+glyph cells that moved or changed, stamping glyphs from a cache of
+pre-rendered tiles. Frames are drawn into an "L" canvas holding the green
+channel, since every glyph is (0, brightness, 0) on black.
+
+    rain = DigitalRain()
+    save_animation("digital_rain.gif", rain, FPS * 5)
+
+or stream raw frames to a video encoder:
+
+    python rain.py | ffmpeg -f rawvideo -pix_fmt rgb24 -s 1080x1920 -r 30 -i - rain.mp4
+"""
+from PIL import Image, ImageDraw
+from functools import lru_cache
+import random
+import sys
+from pix import WIDTH, HEIGHT, PIXEL_SIZE
+
+CHARS = ("0", "1")
+FPS = 30
+# Palette index i is (0, i, 0), so the green canvas can be used as a "P" frame as is
+GREEN_PALETTE = [channel for i in range(256) for channel in (0, i, 0)]
+
+@lru_cache(maxsize=None)
+def glyph_tile(char, brightness, cell=PIXEL_SIZE):
+    """A cell x cell green-channel tile of char on black, as draw_digital_rain draws it"""
+    tile = Image.new("L", (cell, cell), 0)
+    ImageDraw.Draw(tile).text((0, 0), char, fill=brightness)
+    return tile
+
+class DigitalRain:
+    """Animated draw_digital_rain that redraws only changed glyph cells.
+
+    Columns keep the random trail length, speed and characters that
+    draw_digital_rain picks on every call; each frame a character flips
+    with probability flip_chance. Positions follow the same formula, with
+    time starting at start seconds and advancing 1 / fps per frame.
+    """
+
+    def __init__(self, size=(WIDTH, HEIGHT), cell=PIXEL_SIZE, fps=FPS, flip_chance=0.02, start=0.0, rng=random):
+        self.size = size
+        self.cell = cell
+        self.fps = fps
+        self.flip_chance = flip_chance
+        self.start = start
+        self.rng = rng
+        self.image = Image.new("L", size, 0)
+        self.frame = 0
+        self.columns = []
+        for x in range(0, size[0], cell):
+            length = rng.randint(5, 20)
+            speed = rng.randint(1, 3)
+            chars = [rng.choice(CHARS) for _ in range(length)]
+            self.columns.append({"x": x, "length": length, "speed": speed, "chars": chars, "offset": None})
+
+    def _glyph_y(self, column, i):
+        return (self.size[1] + i * self.cell - column["offset"]) % self.size[1]
+
+    def _stamp(self, column, i, dirty):
+        x, y = column["x"], self._glyph_y(column, i)
+        brightness = max(50, 255 - (i * 255 // column["length"]))
+        self.image.paste(glyph_tile(column["chars"][i], brightness, self.cell), (x, y))
+        dirty.append((x, y, x + self.cell, y + self.cell))
+
+    def step(self):
+        """Advance one frame; returns the canvas and the boxes redrawn"""
+        t = self.start + self.frame / self.fps
+        dirty = []
+        for column in self.columns:
+            flips = [i for i in range(column["length"]) if self.rng.random() < self.flip_chance]
+            for i in flips:
+                column["chars"][i] = self.rng.choice(CHARS)
+            offset = int(t * column["speed"] * 10)
+            if offset != column["offset"]:
+                if column["offset"] is not None:
+                    x = column["x"]
+                    for i in range(column["length"]):
+                        y = self._glyph_y(column, i)
+                        self.image.paste(0, (x, y, x + self.cell, y + self.cell))
+                        dirty.append((x, y, x + self.cell, y + self.cell))
+                column["offset"] = offset
+                flips = range(column["length"])
+            for i in flips:
+                self._stamp(column, i, dirty)
+        self.frame += 1
+        return self.image, dirty
+
+    def frames(self, count=None):
+        """Yield (canvas, dirty boxes) per frame; the canvas is reused, so copy it to keep it"""
+        produced = 0
+        while count is None or produced < count:
+            yield self.step()
+            produced += 1
+
+def paletted(canvas):
+    """The green canvas as a "P" image, for GIF and APNG writers"""
+    frame = canvas.convert("P")
+    frame.putpalette(GREEN_PALETTE)
+    return frame
+
+def green_rgb(canvas):
+    black = Image.new("L", canvas.size, 0)
+    return Image.merge("RGB", (black, canvas, black))
+
+def save_animation(path, rain, count, **kwargs):
+    """Write count frames to a looping GIF, or APNG for a .png path.
+
+    Pillow's GIF and APNG writers need every frame before writing, so use
+    write_raw_frames for long clips. GIF palette optimization is off by
+    default; it makes files about a third smaller but encodes 10x slower.
+    """
+    frames = [paletted(canvas) for canvas, _ in rain.frames(count)]
+    kwargs.setdefault("optimize", False)
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=1000 / rain.fps, loop=0, **kwargs)
+    return path
+
+def write_raw_frames(stream, rain, count=None, mode="RGB"):
+    """Write frames to a binary stream as packed rgb24, or gray bytes for mode "L" """
+    for canvas, _ in rain.frames(count):
+        stream.write(green_rgb(canvas).tobytes() if mode == "RGB" else canvas.tobytes())
+
+if __name__ == "__main__":
+    if sys.stdout.isatty():
+        save_animation("digital_rain.gif", DigitalRain(), FPS * 3)
+        print("Saved digital_rain.gif")
+    else:
+        write_raw_frames(sys.stdout.buffer, DigitalRain())
@@ -0,0 +1,69 @@
+"""Every design as an importable, parameterized entry.
+
+Entries name their generator as a "module:function" string, so listing or
+looking up designs imports nothing else; a generator's module, and
+whatever heavy dependencies it has, is only imported when it runs.
+
+    registry.run("gg.flower_pattern", strip_height=512)
+"""
+import importlib
+
+# name -> {"target": "module:function", "params": default keyword arguments, "about": one line}
+GENERATORS = {}
+
+def register(design, target, about="", /, **params):
+    GENERATORS[design] = {"target": target, "params": params, "about": about}
+
+def resolve(target):
+    """Import the function named by a "module:function" target"""
+    module_name, func_name = target.split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+def names(prefix=""):
+    return [name for name in GENERATORS if name.startswith(prefix)]
+
+def lookup(design):
+    """The function and default params for a registry name or a "module:function" target"""
+    if design in GENERATORS:
+        entry = GENERATORS[design]
+        return resolve(entry["target"]), dict(entry["params"])
+    if ":" not in design:
+        raise KeyError(f"Unknown design {design!r}")
+    return resolve(design), {}
+
+def run(design, /, **params):
+    """Run a design with its default params, overridden by params"""
+    func, defaults = lookup(design)
+    return func(**{**defaults, **params})
+
+for name in ("radial_symmetry", "concentric_triangles", "diagonal_stripes", "circular_grid", "flower_pattern"):
+    register(f"gg.{name}", "gg:generate_design", f"4K vertical {name.replace('_', ' ')}", name=name)
+
+PIX_DESIGNS = ("mountains", "space_invaders", "hearts", "retro_landscape", "digital_rain",
+               "sunset", "minecraft_blocks", "city", "ocean", "abstract")
+for num, name in enumerate(PIX_DESIGNS, 1):
+    register(f"pix.{name}", "pix:generate_pixel_wallpaper", f"Mobile pixel art: {name.replace('_', ' ')}",
+             wallpaper_num=num)
+
+register("ge.hex", "ge:generate_hex_wallpaper", "4K hexagon grid with glows")
+register("4k.geometric", "4k:generate_geometric_wallpaper", "4K symmetric polygons, random seed names the file")
+
+for suffix, params in (
+    ("classic", {}),
+    ("amplitude_high", {"amplitude": 100}),
+    ("frequency_high", {"frequency": 10}),
+    ("color_shifted", {"color_shift": 0.5}),
+    ("dense", {"amplitude": 30, "frequency": 15, "color_shift": 0.25}),
+):
+    register(f"wave.{suffix}", "wave:generate_wave_wallpaper", f"4K vertical waves, {suffix.replace('_', ' ')}",
+             name_suffix=suffix, **params)
+
+register("tiles.random", "10:create_tiled_wallpaper", "Random 10x10 tile")
+register("tiles.cycle", "pi:create_wallpaper", "Color-cycling 10x10 tile")
+register("hug.prompt", "hug:generate_wallpaper", "Text to image on a hosted model, needs prompt=")
+
+register("map.geopandas", "map:create_nigeria_map_geopandas", "Nigeria from Natural Earth, needs geopandas")
+register("map.interactive", "map:create_nigeria_interactive_map", "Folium HTML map of Nigerian cities")
+register("map.states", "map:create_detailed_nigeria_map", "Nigerian states as labelled points")
+register("map.outline", "map:create_simple_nigeria_outline", "Approximate outline of Nigeria")
+register("map.region", "map:render_region", "Headless wallpaper of one geodata region, needs region=")
@@ -0,0 +1,83 @@
+"""Reproducible mass generation of design variants, split into shards.
+
+A job is a registry design and a range of seeds. Each variant draws from
+its own random.Random, seeded from (design, seed) alone, so shards can run
+in any order on any process or machine, and any single variant can be
+re-rendered on demand instead of stored:
+
+    python shards.py pix.abstract 0 1000000 --shard 3/64
+    render_variant("pix.abstract", 421337)
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import inspect
+import os
+import random
+import registry
+
+VARIANT_DIR = "wallpapers/variants"
+
+def variant_seed(design, seed):
+    """A stable 64-bit seed for one variant, unlike hash() it is the same in every process"""
+    digest = hashlib.sha256(f"{design}:{seed}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def variant_rng(design, seed):
+    return random.Random(variant_seed(design, seed))
+
+def variant_path(design, seed, output_dir=VARIANT_DIR, ext="png"):
+    return os.path.join(output_dir, design, f"{seed}.{ext}")
+
+def render_variant(design, seed, output_dir=VARIANT_DIR, ext="png", **params):
+    """Render variant seed of design; the same arguments always give the same image.
+
+    Generators taking an rng get variant_rng(design, seed); generators that
+    seed themselves get variant_seed(design, seed) as their seed. The output
+    goes to variant_path unless params sets file_path.
+    """
+    func, defaults = registry.lookup(design)
+    accepted = inspect.signature(func).parameters
+    if "rng" in accepted:
+        params["rng"] = variant_rng(design, seed)
+    elif "seed" in accepted:
+        params["seed"] = variant_seed(design, seed)
+    else:
+        raise ValueError(f"{design} takes no rng or seed, so it has no variants")
+    if "file_path" in accepted and "file_path" not in params:
+        params["file_path"] = variant_path(design, seed, output_dir, ext)
+        os.makedirs(os.path.dirname(params["file_path"]), exist_ok=True)
+    return func(**{**defaults, **params})
+
+def shard_range(start, stop, index, count):
+    """Seeds [start, stop) of shard index out of count contiguous, near-equal shards"""
+    total = stop - start
+    return range(start + total * index // count, start + total * (index + 1) // count)
+
+def run_shard(design, seeds, **params):
+    """Render every seed of one shard in this process; returns the outputs in seed order"""
+    return [render_variant(design, seed, **params) for seed in seeds]
+
+def render_shards(design, start, stop, shards=None, workers=None, **params):
+    """Split seeds [start, stop) into shards and render them across a process pool"""
+    workers = workers or os.cpu_count()
+    shards = shards or workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_shard, design, shard_range(start, stop, i, shards), **params)
+                   for i in range(shards)]
+        return [output for future in futures for output in future.result()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a shard of design variants")
+    parser.add_argument("design")
+    parser.add_argument("start", type=int)
+    parser.add_argument("stop", type=int)
+    parser.add_argument("--shard", default="0/1", help="index/count of the shard to run on this node")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--output-dir", default=VARIANT_DIR)
+    args = parser.parse_args()
+
+    index, count = map(int, args.shard.split("/"))
+    seeds = shard_range(args.start, args.stop, index, count)
+    outputs = render_shards(args.design, seeds.start, seeds.stop, workers=args.workers, output_dir=args.output_dir)
+    print(f"Rendered {len(outputs)} variants of {args.design}, seeds {seeds.start}-{seeds.stop - 1}")
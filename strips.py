@@ -0,0 +1,118 @@
+from PIL import Image, ImageDraw
+import numpy as np
+import struct
+import tracing
+import zlib
+
+def _pairs(xy):
+    if xy and isinstance(xy[0], (tuple, list)):
+        return [tuple(point) for point in xy]
+    return list(zip(xy[0::2], xy[1::2]))
+
+def _shape(name):
+    def method(self, xy, *args, **kwargs):
+        points = [(x, int(y) - self.top) for x, y in _pairs(xy)]
+        pad = kwargs.get('width', 1) + 2
+        ys = [y for _, y in points]
+        if max(ys) + pad < 0 or min(ys) - pad > self.image.height:
+            return
+        getattr(self._draw, name)(points, *args, **kwargs)
+    method.__name__ = name
+    return method
+
+def _anchored(name, pad):
+    def method(self, xy, *args, **kwargs):
+        x, y = xy
+        if y - self.top + pad < 0 or y - self.top - pad > self.image.height:
+            return
+        getattr(self._draw, name)((x, int(y) - self.top), *args, **kwargs)
+    method.__name__ = name
+    return method
+
+class StripDraw:
+    """ImageDraw stand-in that draws full-frame coordinates onto one strip.
+
+    Coordinates are shifted up by top, so draw functions written against
+    the whole canvas can run unchanged per strip. Pillow truncates float
+    coordinates towards zero, so y is truncated before the shift; otherwise
+    shapes starting above the strip would round the other way. Shapes that
+    cannot touch the strip are skipped.
+    """
+
+    def __init__(self, image, top):
+        self.image = image
+        self.top = top
+        self._draw = ImageDraw.Draw(image)
+
+    ellipse = _shape('ellipse')
+    line = _shape('line')
+    polygon = _shape('polygon')
+    rectangle = _shape('rectangle')
+    arc = _shape('arc')
+    text = _anchored('text', 64)
+
+    def bitmap(self, xy, bitmap, fill=None):
+        x, y = xy
+        if y - self.top + bitmap.height < 0 or y - self.top > self.image.height:
+            return
+        self._draw.bitmap((x, int(y) - self.top), bitmap, fill=fill)
+
+def render_strips(size, draw_func, strip_height=256, background="black", halo=0, post=None):
+    """Render a size (width, height) frame as a sequence of horizontal strips.
+
+    draw_func(draw) is called once per strip with a StripDraw; one drawing
+    random shapes must replay the same ones for every strip. post(strip,
+    top) may replace the strip before it is yielded; halo extra rows are
+    rendered on both sides for it and cropped afterwards, so neighbourhood
+    filters such as a blur match a full-frame render.
+    """
+    width, height = size
+    for top in range(0, height, strip_height):
+        bottom = min(top + strip_height, height)
+        y0 = max(0, top - halo)
+        y1 = min(height, bottom + halo)
+        strip = Image.new("RGB", (width, y1 - y0), background)
+        with tracing.stage("draw", strip.width * strip.height):
+            draw_func(StripDraw(strip, y0))
+        if post is not None:
+            strip = post(strip, y0)
+        if (y0, y1) != (top, bottom):
+            strip = strip.crop((0, top - y0, width, bottom - y0))
+        yield strip
+
+def _chunk(kind, data):
+    body = kind + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+def write_png(path, size, strips, compress_level=6):
+    """Stream RGB strips into a PNG file without holding the whole frame.
+
+    Rows use the PNG "Up" filter, carrying the last row of each strip into
+    the next, and every strip is written as its own IDAT chunk.
+    """
+    if not path.lower().endswith(".png"):
+        raise ValueError(f"Streaming output only supports PNG, got {path}")
+    width, height = size
+    compressor = zlib.compressobj(compress_level)
+    previous = np.zeros((1, width * 3), dtype=np.uint8)
+    written = 0
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        for strip in strips:
+            with tracing.stage("encode", strip.width * strip.height):
+                rows = np.asarray(strip.convert("RGB")).reshape(strip.height, width * 3)
+                filtered = np.empty((strip.height, width * 3 + 1), dtype=np.uint8)
+                filtered[:, 0] = 2  # Up filter
+                np.subtract(rows, np.concatenate([previous, rows[:-1]]), out=filtered[:, 1:], casting="unsafe")
+                previous = rows[-1:]
+                written += strip.height
+                data = compressor.compress(filtered.tobytes())
+                if data:
+                    f.write(_chunk(b"IDAT", data))
+        if written != height:
+            raise ValueError(f"Strips covered {written} rows, expected {height}")
+        f.write(_chunk(b"IDAT", compressor.flush()))
+        f.write(_chunk(b"IEND", b""))
+    return path
@@ -0,0 +1,28 @@
+import importlib
+import random
+from PIL import Image
+from dedup import DedupIndex, dhash
+
+tiles = importlib.import_module("10")
+
+def test_distinct_tiled_patterns_are_admitted():
+    rng = random.Random(0)
+    index = DedupIndex(":memory:")
+    patterns, rejected = set(), 0
+    for i in range(300):
+        pattern = tiles.create_pattern(tiles.colors, tiles.pattern_size, rng)
+        patterns.add(str(pattern))
+        rejected += not index.admit(tiles.create_tile(pattern), f"pattern_{i}")
+    index.close()
+    assert len(patterns) == 300
+    assert rejected == 0
+
+def test_near_duplicate_is_rejected_without_a_key():
+    index = DedupIndex(":memory:")
+    img = Image.linear_gradient('L').resize((90, 80))
+    assert index.admit(img)
+    assert not index.admit(img)
+    value = dhash(img)
+    assert index.match(value ^ 0b111) is not None
+    assert index.match(value ^ 0b1111) is None
+    index.close()
@@ -0,0 +1,32 @@
+from PIL import Image, ImageDraw
+import numpy as np
+import random
+import pytest
+import pix
+from palette import to_palette
+
+def draw_rgb(num, grid_mode=True):
+    img = Image.new('RGB', (pix.WIDTH, pix.HEIGHT), (0, 0, 0))
+    pix.draw_wallpaper(img, ImageDraw.Draw(img), num, grid_mode, random.Random(num))
+    return img
+
+@pytest.mark.parametrize("num", range(1, 10))
+def test_to_palette_round_trips(num):
+    img = draw_rgb(num)
+    indexed = to_palette(img)
+    assert indexed.mode == 'P'
+    assert np.array_equal(np.asarray(indexed.convert('RGB')), np.asarray(img))
+
+def test_to_palette_keeps_undeclared_colors():
+    img = Image.new('RGB', (4, 4), (10, 20, 30))
+    img.putpixel((0, 0), (255, 0, 0))
+    assert to_palette(img, [(10, 20, 30)]) is img
+
+@pytest.mark.parametrize("grid_mode", [True, False])
+@pytest.mark.parametrize("num", range(1, 11))
+def test_pix_saves_the_rgb_design(tmp_path, num, grid_mode):
+    file_path = tmp_path / f"{num}.png"
+    pix.generate_pixel_wallpaper(num, str(file_path), grid_mode, rng=random.Random(num))
+    with Image.open(file_path) as saved:
+        assert saved.mode == ('RGB' if num == 10 else 'P')
+        assert np.array_equal(np.asarray(saved.convert('RGB')), np.asarray(draw_rgb(num, grid_mode)))
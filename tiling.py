@@ -0,0 +1,46 @@
+from PIL import Image
+import numpy as np
+from palette import indexed_image
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+def tile_array(pattern, size):
+    """Repeat an array to size (width, height), cropping partial edge tiles"""
+    width, height = size
+    reps = (_ceil_div(height, pattern.shape[0]), _ceil_div(width, pattern.shape[1]))
+    reps += (1,) * (pattern.ndim - 2)
+    return np.tile(pattern, reps)[:height, :width]
+
+def tiled_wallpaper(indices, colors, pixel_size, size, mode='RGB'):
+    """Tile a (rows, cols) pattern of indices into colors across size.
+
+    The pattern is tiled and colored at cell resolution, then scaled up by
+    pixel_size in one nearest-neighbour resize, so the full-size buffer is
+    written exactly once. Tiles cut off at the right and bottom edges are
+    drawn partially rather than left black. With mode='P' the indices are
+    kept as an indexed image over colors, which is a third of the size and
+    saves to a much smaller PNG.
+    """
+    width, height = size
+    cells = tile_array(np.asarray(indices), (_ceil_div(width, pixel_size), _ceil_div(height, pixel_size)))
+    if mode == 'P':
+        tiles = indexed_image(cells, colors)
+    else:
+        tiles = Image.fromarray(np.asarray(colors, dtype=np.uint8)[cells], 'RGB')
+    wallpaper = tiles.resize((tiles.width * pixel_size, tiles.height * pixel_size), Image.NEAREST)
+    return wallpaper.crop((0, 0, width, height)) if wallpaper.size != size else wallpaper
+
+def random_wallpapers(colors, pattern_size, pixel_size, size, count=None, seed=None, mode='RGB'):
+    """Yield wallpapers tiled from fresh random patterns.
+
+    Runs forever when count is None. Patterns come from one NumPy generator,
+    so the same seed reproduces the same sequence.
+    """
+    rng = np.random.default_rng(seed)
+    shape = (pattern_size[1], pattern_size[0])
+    produced = 0
+    while count is None or produced < count:
+        indices = rng.integers(len(colors), size=shape, dtype=np.uint8)
+        yield tiled_wallpaper(indices, colors, pixel_size, size, mode)
+        produced += 1
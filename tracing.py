@@ -0,0 +1,185 @@
+"""Per-stage timing records for wallpaper renders.
+
+Generators wrap each render in render() and each step in stage(). Both are
+no-ops until enable() installs a Tracer, which then collects one record
+per render for Chrome trace export or an aggregate summary.
+
+    tracer = tracing.enable()
+    ... render wallpapers ...
+    tracer.export_chrome("trace.json")
+    print(tracer.format_summary())
+
+Setting WALLPAPER_TRACE=trace.json enables tracing for a whole script run
+and exports the trace when it exits; "{pid}" in the path is replaced by
+the process id so pool workers write separate files.
+"""
+from contextlib import contextmanager
+import atexit
+import contextvars
+import json
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+
+_tracer = None
+_current = contextvars.ContextVar("render_record", default=None)
+
+class RenderRecord:
+    def __init__(self, name, info):
+        self.name = name
+        self.info = info
+        self.start = time.perf_counter()
+        self.end = None
+        self.stages = []
+        self.output_bytes = None
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "info": self.info,
+            "seconds": self.end - self.start,
+            "output_bytes": self.output_bytes,
+            "stages": self.stages,
+        }
+
+class Tracer:
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.records = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def export_chrome(self, path):
+        """Write all records as complete ("X") events in Chrome trace format"""
+        events = []
+        for record in self.records:
+            events.append({
+                "name": record.name, "cat": "render", "ph": "X",
+                "ts": record.start * 1e6, "dur": (record.end - record.start) * 1e6,
+                "pid": record.pid, "tid": record.tid,
+                "args": dict(record.info, output_bytes=record.output_bytes),
+            })
+            for stage in record.stages:
+                events.append({
+                    "name": stage["name"], "cat": "stage", "ph": "X",
+                    "ts": stage["start"] * 1e6, "dur": stage["seconds"] * 1e6,
+                    "pid": record.pid, "tid": stage["tid"],
+                    "args": {key: stage[key] for key in ("pixels", "alloc_bytes") if stage[key] is not None},
+                })
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+    def summary(self):
+        """Aggregate stage durations across records, keyed by stage name"""
+        by_stage = {}
+        for record in self.records:
+            for stage in record.stages:
+                by_stage.setdefault(stage["name"], []).append(stage)
+        summary = {}
+        for name, stages in by_stage.items():
+            seconds = sorted(stage["seconds"] for stage in stages)
+            summary[name] = {
+                "count": len(stages),
+                "total_seconds": sum(seconds),
+                "mean_seconds": statistics.fmean(seconds),
+                "p95_seconds": seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))],
+                "pixels": sum(stage["pixels"] or 0 for stage in stages),
+            }
+        return summary
+
+    def format_summary(self):
+        lines = [f"{'stage':16} {'count':>7} {'total s':>9} {'mean ms':>9} {'p95 ms':>9}"]
+        for name, row in sorted(self.summary().items(), key=lambda item: -item[1]["total_seconds"]):
+            lines.append(f"{name:16} {row['count']:7d} {row['total_seconds']:9.3f} "
+                         f"{row['mean_seconds'] * 1000:9.1f} {row['p95_seconds'] * 1000:9.1f}")
+        output = [record.output_bytes for record in self.records if record.output_bytes]
+        if output:
+            lines.append(f"{len(self.records)} renders, {sum(output)} output bytes")
+        return "\n".join(lines)
+
+def enable(memory=False):
+    """Start collecting records; memory=True also tracks Python-visible allocations"""
+    global _tracer
+    _tracer = Tracer(memory)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return _tracer
+
+def disable():
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+@contextmanager
+def render(name, **info):
+    """Collect the stages run inside this block as one render record"""
+    tracer = _tracer
+    if tracer is None:
+        yield None
+        return
+    record = RenderRecord(name, info)
+    token = _current.set(record)
+    try:
+        yield record
+    finally:
+        _current.reset(token)
+        record.end = time.perf_counter()
+        tracer.add(record)
+
+@contextmanager
+def stage(name, pixels=None):
+    """Time one step of the current render, if one is being recorded"""
+    record = _current.get()
+    if record is None:
+        yield
+        return
+    memory = _tracer is not None and _tracer.memory and tracemalloc.is_tracing()
+    if memory:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        alloc = tracemalloc.get_traced_memory()[1] - before if memory else None
+        _append(record, name, start, time.perf_counter() - start, pixels, alloc)
+
+def add_stage(name, start, seconds, pixels=None):
+    """Record a step of the current render that was timed elsewhere, e.g. summed over bands"""
+    record = _current.get()
+    if record is not None:
+        _append(record, name, start, seconds, pixels, None)
+
+def _append(record, name, start, seconds, pixels, alloc):
+    record.stages.append({
+        "name": name,
+        "start": start,
+        "seconds": seconds,
+        "pixels": pixels,
+        "alloc_bytes": alloc,
+        "tid": threading.get_ident(),
+    })
+
+def output(path):
+    """Note the size of the file the current render wrote"""
+    record = _current.get()
+    if record is not None:
+        record.output_bytes = os.path.getsize(path)
+
+def _export_at_exit(path):
+    tracer = disable()
+    if tracer is not None and tracer.records:
+        tracer.export_chrome(path.replace("{pid}", str(os.getpid())))
+        print(tracer.format_summary())
+
+if os.environ.get("WALLPAPER_TRACE"):
+    enable()
+    atexit.register(_export_at_exit, os.environ["WALLPAPER_TRACE"])
@@ -0,0 +1,43 @@
+from PIL import Image
+from functools import lru_cache
+import numpy as np
+
+def radial_opacity(size, center, intensity=0.6, top=0, bottom=None):
+    """Vignette opacity for rows top..bottom of a size frame as a uint8 array.
+
+    Opacity is 0 at the center and rises linearly to 255 * intensity at the
+    farthest corner.
+    """
+    width, height = size
+    cx, cy = center
+    ys, xs = np.ogrid[top:height if bottom is None else bottom, :width]
+    distance = np.hypot(xs - cx, ys - cy, dtype=np.float32)
+    farthest = max(np.hypot(cx, cy), np.hypot(width - cx, cy),
+                   np.hypot(cx, height - cy), np.hypot(width - cx, height - cy))
+    opacity = np.minimum(distance / farthest, 1.0) * (255 * intensity)
+    return opacity.astype(np.uint8)
+
+@lru_cache(maxsize=16)
+def radial_mask(size, center, intensity=0.6):
+    """Build an "L" mask that darkens with distance from center.
+
+    Masks are cached per (size, center, intensity), so treat the returned
+    image as read-only.
+    """
+    return Image.fromarray(radial_opacity(size, center, intensity), "L")
+
+def apply_vignette(img, center=None, intensity=0.6, frame_size=None, top=0):
+    """Darken img in place towards the edges of its frame.
+
+    img is normally the whole frame. For strip rendering pass the full
+    frame_size and the strip's top row; only the strip's rows are computed.
+    """
+    if frame_size is None:
+        frame_size = img.size
+    if center is None:
+        center = (frame_size[0] // 2, frame_size[1] // 2)
+    if img.size == frame_size:
+        mask = radial_mask(frame_size, center, intensity)
+    else:
+        mask = Image.fromarray(radial_opacity(frame_size, center, intensity, top, top + img.height), "L")
+    img.paste("black", None, mask)
@@ -1,42 +1,133 @@
 
 from PIL import Image, ImageDraw
 import math
-import colorsys
+import numpy as np
+from hsv import hsv2rgb_array
 import os
-
-# Create output directory
-os.makedirs("wallpapers", exist_ok=True)
+import tracing
+from cache import RenderCache, render_key
+from derive import derive_rendered, save_derived
+from encode import EncodeQueue, save_image
+from strips import render_strips, write_png
 
 # 4K mobile wallpaper dimensions
 WIDTH, HEIGHT = 2160, 3840
+LINE_SPACING, POINT_SPACING = 10, 5
+
+# Live wallpaper frames
+FRAME_SIZE = (1080, 1920)
+FPS = 30
+FRAME_LINE_ROWS = (-1, 0, 1, 2)  # Rows of 1 pixel lines that stand in for one 3 pixel wide line
+CACHE_MODULES = (__name__, "hsv", "strips")  # Hashed into cache keys
+
+def wave_phases(frequency, width, height):
+    """Phase of every polyline point before animation, as a (lines, points) array"""
+    x = np.arange(0, width, POINT_SPACING)
+    y = np.arange(0, height, LINE_SPACING)[:, None]
+    return (x / width) * frequency * 2 * math.pi + y / 100
+
+def wave_points(amplitude, phases, width, height, phase=0.0):
+    """All polylines as a (lines, 2 * points) array of flat x0, y0, x1, y1, ... coordinates"""
+    lines, count = phases.shape
+    points = np.empty((lines, count, 2))
+    points[..., 0] = np.arange(0, width, POINT_SPACING)
+    points[..., 1] = np.arange(0, height, LINE_SPACING)[:, None] + amplitude * np.sin(phases + phase)
+    return points.reshape(lines, -1)
+
+def wave_colors(color_shift, height):
+    """Line colors, shifting hue from top to bottom"""
+    hue = (np.arange(0, height, LINE_SPACING) / height + color_shift) % 1.0
+    return list(map(tuple, hsv2rgb_array(hue, 0.8, 1).tolist()))
 
-def hsv2rgb(h, s, v):
-    """Convert HSV to RGB (0-255)"""
-    return tuple(round(i * 255) for i in colorsys.hsv_to_rgb(h, s, v))
-
-def draw_wave_pattern(draw, amplitude, frequency, color_shift):
-    """Draw sinusoidal wave pattern line-by-line"""
-    for y in range(0, HEIGHT, 10):
-        points = []
-        for x in range(0, WIDTH, 5):
-            offset = amplitude * math.sin((x / WIDTH) * frequency * 2 * math.pi + y / 100)
-            points.append((x, y + offset))
-        hue = ((y / HEIGHT) + color_shift) % 1.0
-        color = hsv2rgb(hue, 0.8, 1)
-        draw.line(points, fill=color, width=3)
-
-def generate_wave_wallpaper(name_suffix, amplitude=50, frequency=4, color_shift=0.0):
-    """Generate and save a 4K wave wallpaper"""
-    image = Image.new("RGB", (WIDTH, HEIGHT), "black")
+def draw_wave_pattern(draw, amplitude, frequency, color_shift, phase=0.0):
+    """Draw sinusoidal wave pattern line-by-line from precomputed geometry"""
+    points = wave_points(amplitude, wave_phases(frequency, WIDTH, HEIGHT), WIDTH, HEIGHT, phase).tolist()
+    for line, color in zip(points, wave_colors(color_shift, HEIGHT)):
+        draw.line(line, fill=color, width=3)
+
+def wave_frames(amplitude=50, frequency=4, color_shift=0.0, size=FRAME_SIZE, fps=FPS, speed=1.0, count=None):
+    """Yield animation frames with the waves travelling speed radians per second.
+
+    Geometry and colors are computed once; each frame only re-evaluates the
+    sine at the new phase. Pillow draws 3 pixel wide lines as a polygon per
+    segment, so frames draw each wave as 1 pixel lines on FRAME_LINE_ROWS
+    instead, which is about twice as fast and covers the same pixels to
+    within a row at the edges. Frames are drawn into one reused image, so copy a frame before
+    asking for the next if it must be kept. Runs forever when count is None.
+    """
+    width, height = size
+    phases = wave_phases(frequency, width, height)
+    colors = [color for color in wave_colors(color_shift, height) for _ in FRAME_LINE_ROWS]
+    # Row offsets applied to the y coordinates only
+    offsets = np.zeros((len(FRAME_LINE_ROWS), phases.shape[1] * 2))
+    offsets[:, 1::2] = np.array(FRAME_LINE_ROWS)[:, None]
+    image = Image.new("RGB", size, "black")
     draw = ImageDraw.Draw(image)
-    draw_wave_pattern(draw, amplitude, frequency, color_shift)
-    file_path = f"wallpapers/geometric_4k_wave_{name_suffix}.jpg"
-    image.save(file_path, "JPEG", quality=95)
-    print(f"Saved: {file_path}")
+    frame = 0
+    while count is None or frame < count:
+        draw.rectangle((0, 0, width, height), fill="black")
+        points = wave_points(amplitude, phases, width, height, speed * frame / fps)
+        points = (points[:, None, :] + offsets).reshape(-1, points.shape[1]).tolist()
+        for line, color in zip(points, colors):
+            draw.line(line, fill=color)
+        yield image
+        frame += 1
+
+def render_wave_wallpaper(file_path, amplitude, frequency, color_shift, strip_height=None, encoder=None,
+                          profiles=None):
+    with tracing.render("wave", size=(WIDTH, HEIGHT), amplitude=amplitude, frequency=frequency,
+                        color_shift=color_shift, strip_height=strip_height):
+        if strip_height:
+            strips = render_strips(
+                (WIDTH, HEIGHT),
+                lambda draw: draw_wave_pattern(draw, amplitude, frequency, color_shift),
+                strip_height,
+            )
+            write_png(file_path, (WIDTH, HEIGHT), strips)
+            tracing.output(file_path)
+            if profiles:
+                with tracing.stage("derive"):
+                    derive_rendered(file_path, profiles, encoder=encoder)
+        else:
+            image = Image.new("RGB", (WIDTH, HEIGHT), "black")
+            draw = ImageDraw.Draw(image)
+            with tracing.stage("draw", WIDTH * HEIGHT):
+                draw_wave_pattern(draw, amplitude, frequency, color_shift)
+            save_image(image, file_path, "JPEG", quality=95, encoder=encoder)
+            if profiles:
+                with tracing.stage("derive", WIDTH * HEIGHT):
+                    save_derived(image, file_path, profiles, "JPEG", quality=95, encoder=encoder)
+    return file_path
+
+def generate_wave_wallpaper(name_suffix, amplitude=50, frequency=4, color_shift=0.0,
+                            strip_height=None, file_path=None, cache=None, encoder=None, profiles=None):
+    """Generate and save a 4K wave wallpaper, streamed to PNG in strips if strip_height is set.
+
+    With an EncodeQueue the JPEG is written in the background. profiles
+    also saves device-sized copies (see derive.DEVICE_PROFILES) beside it.
+    """
+    fmt = "png" if strip_height else "jpg"
+    if file_path is None:
+        os.makedirs("wallpapers", exist_ok=True)
+        file_path = f"wallpapers/geometric_4k_wave_{name_suffix}.{fmt}"
+    if cache is None:
+        render_wave_wallpaper(file_path, amplitude, frequency, color_shift, strip_height, encoder, profiles)
+    else:
+        params = {"amplitude": amplitude, "frequency": frequency, "color_shift": color_shift}
+        key = render_key(CACHE_MODULES, params, None, (WIDTH, HEIGHT), fmt)
+        cache.render(key, fmt,
+                     lambda path: render_wave_wallpaper(path, strip_height=strip_height, encoder=encoder,
+                                                        profiles=profiles, **params),
+                     file_path, encoder, profiles)
+    print(f"{'Queued' if encoder else 'Saved'}: {file_path}")
+    return file_path
 
 # Generate multiple wave designs with different properties
-generate_wave_wallpaper("classic")  # balanced
-generate_wave_wallpaper("amplitude_high", amplitude=100)
-generate_wave_wallpaper("frequency_high", frequency=10)
-generate_wave_wallpaper("color_shifted", color_shift=0.5)
-generate_wave_wallpaper("dense", amplitude=30, frequency=15, color_shift=0.25)
+if __name__ == "__main__":
+    cache = RenderCache()
+    with EncodeQueue() as encoder:
+        generate_wave_wallpaper("classic", cache=cache, encoder=encoder)  # balanced
+        generate_wave_wallpaper("amplitude_high", amplitude=100, cache=cache, encoder=encoder)
+        generate_wave_wallpaper("frequency_high", frequency=10, cache=cache, encoder=encoder)
+        generate_wave_wallpaper("color_shifted", color_shift=0.5, cache=cache, encoder=encoder)
+        generate_wave_wallpaper("dense", amplitude=30, frequency=15, color_shift=0.25, cache=cache, encoder=encoder)